@@ -0,0 +1,159 @@
+"""Moteurs de reconnaissance vocale (ASR) interchangeables.
+
+Tous les moteurs respectent le même contrat : `transcribe(audio)` prend un
+segment (tableau float32 mono à 16 kHz, ou chemin d'un fichier audio) et
+retourne le texte transcrit. Si `words` est une liste, elle est remplie avec
+les horodatages des mots ({'word', 'start', 'end'}, en secondes). `prompt`
+(texte déjà transcrit juste avant) sert de contexte au décodeur.
+`transcribe_batch(audios)` transcrit plusieurs segments d'un coup.
+"""
+
+# Durée maximale d'un segment traité en lot (fenêtre de l'encodeur Whisper)
+BATCH_MAX_SECONDS = 30
+
+
+class ASRBackend:
+    """Interface commune des moteurs de transcription"""
+
+    engine = None
+
+    def __init__(self, model_size, language="fr", asr_config=None):
+        self.model_size = model_size
+        self.language = language
+        self.asr_config = asr_config or {}
+        self.model = None
+
+    def load(self):
+        """Charge le modèle (à implémenter par chaque moteur)"""
+        raise NotImplementedError
+
+    def transcribe(self, audio, words=None, prompt=None):
+        """Transcrit un segment et retourne le texte (à implémenter par chaque moteur)"""
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, words_lists=None, prompts=None):
+        """Transcrit plusieurs segments et retourne la liste des textes
+
+        Par défaut, les segments sont simplement transcrits l'un après l'autre.
+        """
+        words_lists = words_lists or [None] * len(audios)
+        prompts = prompts or [None] * len(audios)
+        return [self.transcribe(audio, words, prompt) for audio, words, prompt in zip(audios, words_lists, prompts)]
+
+    def describe(self):
+        """Description courte pour l'affichage console"""
+        return f"{self.engine} '{self.model_size}'"
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper (PyTorch), en fp32 sur CPU"""
+
+    engine = "whisper"
+
+    def load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_size)
+
+    def transcribe(self, audio, words=None, prompt=None):
+        result = self.model.transcribe(
+            audio,
+            language=self.language,
+            fp16=False,
+            verbose=False,
+            condition_on_previous_text=False,
+            initial_prompt=prompt,
+            temperature=0.0,
+            word_timestamps=words is not None
+        )
+        if words is not None:
+            for segment in result["segments"]:
+                words.extend({'word': w["word"], 'start': w["start"], 'end': w["end"]}
+                             for w in segment.get("words", []))
+        return result["text"].strip()
+
+    def transcribe_batch(self, audios, words_lists=None, prompts=None):
+        """Transcrit un lot en un seul passage de l'encodeur et un décodage parallèle
+
+        Chaque segment est complété à 30 s de mel, comme le fait Whisper. Le
+        décodage en lot ne donne pas les horodatages des mots : les listes
+        `words` restent vides et l'extrait est alors situé par estimation.
+        Les segments avec un contexte (`prompts`) sont transcrits un par un.
+        """
+        import torch
+        import whisper
+
+        too_long = any(len(audio) > BATCH_MAX_SECONDS * whisper.audio.SAMPLE_RATE for audio in audios)
+        if len(audios) == 1 or too_long or any(prompts or []):
+            return super().transcribe_batch(audios, words_lists, prompts)
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=self.model.dims.n_mels)
+            for audio in audios
+        ]).to(self.model.device)
+
+        options = whisper.DecodingOptions(
+            language=self.language,
+            fp16=False,
+            temperature=0.0,
+            without_timestamps=True
+        )
+        results = whisper.decode(self.model, mels, options)
+
+        # Même filtre anti-hallucination que whisper.transcribe sur les silences
+        return ["" if r.no_speech_prob > 0.6 and r.avg_logprob < -1.0 else r.text.strip() for r in results]
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper (CTranslate2), quantifié int8 par défaut"""
+
+    engine = "faster-whisper"
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_size,
+            device=self.asr_config.get("device", "cpu"),
+            compute_type=self.asr_config.get("compute_type", "int8"),
+            cpu_threads=self.asr_config.get("cpu_threads", 0)
+        )
+
+    def transcribe(self, audio, words=None, prompt=None):
+        segments, _ = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=self.asr_config.get("beam_size", 1),
+            condition_on_previous_text=False,
+            initial_prompt=prompt,
+            temperature=0.0,
+            vad_filter=False,
+            word_timestamps=words is not None
+        )
+        # Les segments sont produits à la demande : les consommer lance le décodage
+        texts = []
+        for segment in segments:
+            texts.append(segment.text)
+            if words is not None:
+                words.extend({'word': w.word, 'start': w.start, 'end': w.end} for w in segment.words or [])
+        return "".join(texts).strip()
+
+    def describe(self):
+        return f"{self.engine} '{self.model_size}' ({self.asr_config.get('compute_type', 'int8')})"
+
+
+ASR_BACKENDS = {
+    WhisperBackend.engine: WhisperBackend,
+    FasterWhisperBackend.engine: FasterWhisperBackend,
+}
+
+
+def create_backend(config):
+    """Instancie le moteur ASR choisi dans la configuration"""
+    asr_config = config.get("asr_config", {})
+    engine = asr_config.get("engine", WhisperBackend.engine)
+
+    backend_class = ASR_BACKENDS.get(engine)
+    if backend_class is None:
+        raise ValueError(f"Moteur ASR inconnu: {engine} (disponibles: {', '.join(ASR_BACKENDS)})")
+
+    return backend_class(config["whisper_model"], language=asr_config.get("language", "fr"),
+                         asr_config=asr_config)
@@ -0,0 +1,162 @@
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from ring_buffer import AudioRingBuffer
+
+
+class MicrophoneSource:
+    """Entrée micro PyAudio, lue en temps réel.
+
+    Le flux est en mode callback : PortAudio dépose chaque bloc dans un
+    tampon circulaire préalloué (`buffer_seconds` de `audio_config`, 2 s par
+    défaut) et `read` en rend une vue, sans allocation ni copie. Les
+    débordements (blocs perdus par PortAudio, ou lecture trop en retard sur
+    le tampon) sont signalés via `on_overflow`.
+    """
+
+    realtime = True
+
+    def __init__(self, audio, audio_config, on_overflow=None):
+        self.audio = audio
+        self.audio_config = audio_config
+        self.on_overflow = on_overflow
+        self.stream = None
+        self.ring = None
+        self.last_write = None
+        self.captured_at = None
+
+    def open(self):
+        """Ouvre le flux du micro"""
+        import pyaudio
+        self.overflow_flag = pyaudio.paInputOverflow
+        self.continue_flag = pyaudio.paContinue
+
+        channels = self.audio_config["channels"]
+        self.sample_rate = self.audio_config["rate"] * channels
+        self.chunk_samples = self.audio_config["chunk"] * channels
+        # Capacité multiple d'un bloc : les fenêtres lues ne chevauchent jamais la fin du tampon
+        chunks = max(4, round(self.audio_config.get("buffer_seconds", 2) * self.sample_rate / self.chunk_samples))
+        self.ring = AudioRingBuffer(chunks * self.chunk_samples)
+        self.reported_overruns = 0
+
+        self.stream = self.audio.open(
+            format=getattr(pyaudio, self.audio_config["format"]),
+            channels=channels,
+            rate=self.audio_config["rate"],
+            input=True,
+            input_device_index=self.audio_config.get("device_index"),
+            frames_per_buffer=self.audio_config["chunk"],
+            stream_callback=self.on_audio
+        )
+
+    def on_audio(self, in_data, frame_count, time_info, status):
+        """Callback PortAudio : copie le bloc dans le tampon circulaire"""
+        if status & self.overflow_flag and self.on_overflow:
+            self.on_overflow()
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        self.last_write = (self.ring.written, time.time())
+        return None, self.continue_flag
+
+    def read(self):
+        """Retourne le prochain bloc PCM (vue sur le tampon, valable jusqu'à la lecture suivante)"""
+        samples = self.ring.read(self.chunk_samples, timeout=2)
+        if samples is None:
+            raise IOError("aucun son reçu du micro depuis 2 s")
+
+        if self.ring.overruns != self.reported_overruns:
+            self.reported_overruns = self.ring.overruns
+            if self.on_overflow:
+                self.on_overflow()
+
+        # Heure de capture de la fin du bloc, déduite du dernier bloc reçu
+        last_write = self.last_write
+        if last_write:
+            written, written_at = last_write
+            self.captured_at = written_at - (written - self.ring.read_position) / self.sample_rate
+        else:
+            self.captured_at = time.time()
+        return memoryview(samples).cast('B')
+
+    def close(self):
+        """Ferme le flux du micro"""
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+
+class FileSource:
+    """Entrée fichier(s) WAV, lus aussi vite que possible.
+
+    Les fichiers sont convertis au format de `audio_config` (canaux et
+    fréquence) puis découpés en blocs de `chunk` trames, comme le micro.
+    """
+
+    realtime = False
+
+    def __init__(self, paths, audio_config):
+        self.paths = expand_inputs(paths)
+        self.audio_config = audio_config
+        self.pcm = b''
+        self.position = 0
+
+    def load(self, path):
+        """Lit un WAV 16 bits et le convertit au format de capture"""
+        with wave.open(str(path), 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: seuls les WAV 16 bits sont pris en charge")
+            channels = wf.getnchannels()
+            rate = wf.getframerate()
+            audio_np = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32)
+
+        audio_np = audio_np.reshape(-1, channels).mean(axis=1)
+
+        target_rate = self.audio_config["rate"]
+        if rate != target_rate:
+            new_length = int(len(audio_np) * target_rate / rate)
+            audio_np = np.interp(np.linspace(0, len(audio_np), new_length, endpoint=False),
+                                 np.arange(len(audio_np)), audio_np)
+
+        target_channels = self.audio_config["channels"]
+        audio_np = np.repeat(audio_np[:, None], target_channels, axis=1)
+        return audio_np.astype(np.int16).tobytes()
+
+    def open(self):
+        """Charge les fichiers en mémoire"""
+        self.pcm = b''.join(self.load(path) for path in self.paths)
+        self.position = 0
+
+    @property
+    def duration(self):
+        """Durée totale (en secondes) des fichiers chargés"""
+        return len(self.pcm) / (2 * self.audio_config["channels"] * self.audio_config["rate"])
+
+    def read(self):
+        """Retourne le prochain bloc PCM, ou None à la fin des fichiers"""
+        if self.position >= len(self.pcm):
+            return None
+        size = self.audio_config["chunk"] * 2 * self.audio_config["channels"]
+        data = self.pcm[self.position:self.position + size]
+        self.position += size
+        return data
+
+    def close(self):
+        """Libère l'audio chargé"""
+        self.pcm = b''
+
+
+def expand_inputs(paths):
+    """Liste les fichiers WAV à partir de fichiers et/ou de dossiers"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.wav")))
+        else:
+            files.append(path)
+    return files
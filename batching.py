@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque
+
+
+class TranscriptionRequest:
+    """Segment en attente de transcription dans un lot"""
+
+    def __init__(self, audio, words, prompt=None):
+        self.audio = audio
+        self.words = words
+        self.prompt = prompt
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+class BatchingTranscriber:
+    """Regroupe les transcriptions demandées en même temps par les workers.
+
+    Un thread dédié fait tourner le modèle ; pendant qu'il travaille, les
+    segments qui arrivent s'accumulent et partent ensemble au passage
+    suivant (jusqu'à `batch_size`). Au repos, un segment seul part tout de
+    suite : la latence n'augmente pas. `max_wait_ms` permet d'attendre un
+    peu pour former des lots plus gros. Avec `batch_size` à 1, le modèle est
+    appelé directement, sans thread.
+    """
+
+    def __init__(self, backend, batch_size=1, max_wait_ms=0, on_batch=None):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.on_batch = on_batch
+
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+
+    def transcribe(self, audio, words=None, prompt=None):
+        """Transcrit un segment (bloque jusqu'au résultat de son lot)"""
+        if self.batch_size == 1:
+            if self.on_batch:
+                self.on_batch(1)
+            return self.backend.transcribe(audio, words=words, prompt=prompt)
+
+        request = TranscriptionRequest(audio, words, prompt)
+        with self.condition:
+            self.pending.append(request)
+            # (Re)lancé au besoin : un segment peut encore arriver juste après la fermeture
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="asr-batch", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.text
+
+    def close(self):
+        """Arrête le thread d'inférence une fois les segments en attente traités"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def next_batch(self):
+        """Attend des segments et retourne le prochain lot (None une fois fermé)"""
+        with self.condition:
+            while not self.pending:
+                if self.closed:
+                    return None
+                self.condition.wait()
+
+            if self.max_wait:
+                deadline = time.monotonic() + self.max_wait
+                while len(self.pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+            count = min(self.batch_size, len(self.pending))
+            return [self.pending.popleft() for _ in range(count)]
+
+    def run(self):
+        """Boucle du thread d'inférence"""
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                return
+            if self.on_batch:
+                self.on_batch(len(batch))
+            try:
+                texts = self.backend.transcribe_batch([r.audio for r in batch], [r.words for r in batch],
+                                                      [r.prompt for r in batch])
+                for request, text in zip(batch, texts):
+                    request.text = text
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from main import TicDetectorApp
+from audio_sources import FileSource, expand_inputs
+
+# Étapes dont on mesure la latence (clés des timings de process_audio_segment)
+STAGES = ["gate_ms", "spot_ms", "conversion_ms", "whisper_ms", "detect_ms", "total_ms"]
+
+
+def percentile(values, p):
+    """Percentile p (0-100) d'une liste de valeurs, par interpolation linéaire"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    position = (len(values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def load_labels(labels_file):
+    """Charge les transcriptions de référence : {nom du fichier WAV: texte}"""
+    if not labels_file:
+        return {}
+    with open(labels_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_benchmark(app, files, labels):
+    """Passe tous les fichiers dans le pipeline et retourne les métriques"""
+    stage_values = {stage: [] for stage in STAGES}
+    audio_seconds = 0.0
+    processing_seconds = 0.0
+    whisper_calls = 0
+    spotted_out = 0
+    true_positives = false_positives = false_negatives = 0
+
+    for path in files:
+        source = FileSource([path], app.config["audio_config"])
+        source.open()
+        audio_seconds += source.duration
+        app.default_room.last_detections.clear()
+
+        detected = Counter()
+        start = time.perf_counter()
+        for audio_data, stats in app.segment_stream(source):
+            timings = app.process_audio_segment(audio_data, stats)
+            for stage in STAGES:
+                if stage in timings:
+                    stage_values[stage].append(timings[stage])
+            if 'whisper_ms' in timings:
+                whisper_calls += 1
+            if timings.get('spotter') == 'skipped':
+                spotted_out += 1
+            for detection in timings.get('detections', []):
+                detected[detection['expression_key']] += detection['matches']
+        processing_seconds += time.perf_counter() - start
+        source.close()
+
+        # Comparaison avec ce que le matcher trouve dans la transcription de référence
+        if path.name in labels:
+            expected = Counter(app.matcher.match(labels[path.name]))
+            for expr_key in expected.keys() | detected.keys():
+                true_positives += min(expected[expr_key], detected[expr_key])
+                false_positives += max(0, detected[expr_key] - expected[expr_key])
+                false_negatives += max(0, expected[expr_key] - detected[expr_key])
+
+    results = {
+        'files': len(files),
+        'audio_seconds': round(audio_seconds, 2),
+        'processing_seconds': round(processing_seconds, 2),
+        'real_time_factor': round(processing_seconds / audio_seconds, 3) if audio_seconds else None,
+        'whisper_calls': whisper_calls,
+        'whisper_calls_per_minute': round(whisper_calls / audio_seconds * 60, 2) if audio_seconds else None,
+        'spotted_out': spotted_out,
+        'latency_ms': {
+            stage.replace('_ms', ''): {
+                'p50': round(percentile(values, 50), 1),
+                'p90': round(percentile(values, 90), 1),
+                'p99': round(percentile(values, 99), 1),
+                'count': len(values)
+            }
+            for stage, values in stage_values.items() if values
+        }
+    }
+
+    if labels:
+        results['precision'] = round(true_positives / (true_positives + false_positives), 3) if true_positives + false_positives else None
+        results['recall'] = round(true_positives / (true_positives + false_negatives), 3) if true_positives + false_negatives else None
+    return results
+
+
+def print_results(model_size, results):
+    """Affiche les métriques d'un modèle"""
+    print(f"\n📊 Modèle '{model_size}' ({results['load_seconds']} s de chargement)")
+    print(f"   • Audio: {results['audio_seconds']} s, traitement: {results['processing_seconds']} s "
+          f"(RTF {results['real_time_factor']})")
+    print(f"   • Appels Whisper: {results['whisper_calls']} ({results['whisper_calls_per_minute']} / min d'audio)")
+    if results['spotted_out']:
+        print(f"   • Écartés par le filtre par mots-clés: {results['spotted_out']} segments")
+    for stage, values in results['latency_ms'].items():
+        print(f"   • {stage:<10} p50 {values['p50']:>8} ms | p90 {values['p90']:>8} ms | "
+              f"p99 {values['p99']:>8} ms ({values['count']} segments)")
+    if 'precision' in results:
+        print(f"   • Précision: {results['precision']}, rappel: {results['recall']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du pipeline enVrai sur des fichiers WAV')
+    parser.add_argument('inputs', nargs='+', help='Fichiers WAV ou dossiers contenant des WAV')
+    parser.add_argument('--config', default='config.json', help='Fichier de configuration')
+    parser.add_argument('--models', help='Modèles à comparer, séparés par des virgules (ex: tiny,base,small)')
+    parser.add_argument('--engine', help='Moteur ASR (whisper, faster-whisper)')
+    parser.add_argument('--spotter', help='Modèle du filtre par mots-clés (ex: tiny), pour mesurer son effet')
+    parser.add_argument('--labels', help='JSON {fichier.wav: transcription de référence} pour précision/rappel')
+    parser.add_argument('--output', help='Fichier JSON où écrire les résultats')
+
+    args = parser.parse_args()
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("❌ Aucun fichier WAV trouvé")
+        return
+    labels = load_labels(args.labels)
+
+    app = TicDetectorApp(args.config, live=False, load_model=False)
+    # Changements propres au benchmark : le fichier de configuration n'est pas modifié
+    if args.engine:
+        app.update_config(lambda config: config.setdefault("asr_config", {}).update(engine=args.engine), save=False)
+
+    if args.spotter:
+        app.update_config(lambda config: config.update(
+            spotter_config=dict(config.get("spotter_config", {}), enabled=True, model=args.spotter, sample_rate=0)
+        ), save=False)
+        app.setup_spotter()
+
+    models = args.models.split(',') if args.models else [app.config["whisper_model"]]
+    all_results = {}
+    for model_size in models:
+        app.update_config(lambda config: config.update(whisper_model=model_size.strip()), save=False)
+        start = time.perf_counter()
+        if not app.load_whisper_model():
+            continue
+        load_seconds = round(time.perf_counter() - start, 2)
+        # Le premier appel au modèle est plus lent : on ne le compte pas
+        app.warm_up_model()
+
+        results = run_benchmark(app, files, labels)
+        results['load_seconds'] = load_seconds
+        all_results[model_size] = results
+        print_results(model_size, results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(all_results, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
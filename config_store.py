@@ -0,0 +1,111 @@
+import copy
+import json
+import os
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+from matcher import ExpressionMatcher
+
+
+class ConfigSnapshot:
+    """Version figée de la configuration, avec le matcher compilé pour ses expressions.
+
+    Une version n'est jamais modifiée : chaque changement en crée une
+    nouvelle. Un lecteur qui garde sa version pour tout un segment voit
+    donc une configuration cohérente, même si elle change entre-temps.
+    """
+
+    def __init__(self, data, matcher, version):
+        self.data = data
+        self.matcher = matcher
+        self.version = version
+
+    @property
+    def expressions(self):
+        return self.data["expressions"]
+
+
+class ConfigStore:
+    """Configuration partagée entre threads, en copie sur écriture.
+
+    `current` est remplacé d'un seul coup à chaque modification. L'écriture
+    du fichier est différée de `save_delay` secondes (plusieurs modifications
+    rapprochées ne font qu'une écriture) et atomique (fichier temporaire
+    puis renommage).
+    """
+
+    def __init__(self, path, data, save_delay=1.0):
+        self.path = Path(path)
+        self.save_delay = save_delay
+        self.current = ConfigSnapshot(data, ExpressionMatcher(data["expressions"]), 0)
+
+        self.write_lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.timer = None
+
+    @classmethod
+    def load(cls, path, save_delay=1.0):
+        """Lit le fichier de configuration (FileNotFoundError / JSONDecodeError si invalide)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(path, json.load(f), save_delay)
+
+    def update(self, mutate, save=True):
+        """Applique `mutate(config)` sur une copie et publie la nouvelle version
+
+        Retourne la nouvelle version ; le fichier est sauvegardé un peu plus
+        tard (sauf avec `save=False`, pour un changement temporaire).
+        """
+        with self.write_lock:
+            previous = self.current
+            data = copy.deepcopy(previous.data)
+            mutate(data)
+
+            matcher = previous.matcher
+            if data["expressions"] != previous.data["expressions"]:
+                matcher = previous.matcher.updated(data["expressions"])
+
+            self.current = ConfigSnapshot(data, matcher, previous.version + 1)
+            if save:
+                self.schedule_save()
+            return self.current
+
+    def schedule_save(self):
+        """(Re)programme l'écriture du fichier"""
+        with self.save_lock:
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.save_delay, self.save)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def save(self):
+        """Écrit la version courante de manière atomique (fichier temporaire puis renommage)"""
+        with self.save_lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            data = self.current.data
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                # mkstemp crée le fichier en 0600 : on garde les droits du fichier remplacé
+                try:
+                    mode = stat.S_IMODE(os.stat(self.path).st_mode)
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+    def flush(self):
+        """Écrit tout de suite une modification en attente"""
+        with self.save_lock:
+            pending = self.timer is not None
+        if pending:
+            self.save()
@@ -0,0 +1,70 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+
+class ControlQueue:
+    """Actions de contrôle (démarrer, arrêter, jouer un son...) exécutées hors des requêtes web.
+
+    `submit` met l'action en file et retourne tout de suite son suivi
+    (`id`, `status`). Un seul thread les exécute dans l'ordre : deux
+    actions ne se chevauchent jamais (un arrêt ne croise pas un démarrage).
+    Les `history` dernières restent consultables ; `on_change` est appelé
+    à chaque changement d'état (pour prévenir l'interface web).
+    """
+
+    def __init__(self, history=100, on_change=None):
+        self.history = history
+        self.on_change = on_change
+        self.jobs = OrderedDict()
+        self.ids = itertools.count(1)
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="control", daemon=True)
+        self.thread.start()
+
+    def submit(self, action, function, *args):
+        """Met une action en file ; retourne son suivi"""
+        with self.lock:
+            job = {'id': next(self.ids), 'action': action, 'status': 'queued', 'submitted': time.time()}
+            self.jobs[job['id']] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+        self.pending.put((job['id'], function, args))
+        self.notify(job)
+        return dict(job)
+
+    def get(self, job_id):
+        """Suivi d'une action (None si inconnue ou trop ancienne)"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job = dict(job)
+        self.notify(job)
+
+    def notify(self, job):
+        if self.on_change:
+            self.on_change(job)
+
+    def run(self):
+        while True:
+            job_id, function, args = self.pending.get()
+            self.update(job_id, status='running')
+            start = time.perf_counter()
+            try:
+                result = function(*args)
+                self.update(job_id, status='done', result=result,
+                            seconds=round(time.perf_counter() - start, 3))
+            except Exception as e:
+                print(f"⚠️ Erreur action {job_id}: {e}")
+                self.update(job_id, status='failed', error=str(e),
+                            seconds=round(time.perf_counter() - start, 3))
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Format des tranches de temps pour les compteurs
+BUCKET_FORMATS = {
+    "minute": "%Y-%m-%dT%H:%M",
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+}
+
+
+class DetectionLog:
+    """Journal persistant des détections (SQLite en mode WAL).
+
+    Chaque détection est ajoutée sur disque, les compteurs par expression et
+    par tranche de temps (minute, heure, jour) sont mis à jour au fil de
+    l'eau, et seules les `recent_size` dernières détections restent en
+    mémoire : la consommation reste stable quelle que soit la durée de
+    fonctionnement, et l'historique survit aux redémarrages.
+    """
+
+    def __init__(self, path="detections.db", recent_size=200):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS detections (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL,
+                ts REAL NOT NULL,
+                expression_key TEXT NOT NULL,
+                matches INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+            CREATE INDEX IF NOT EXISTS detections_expression ON detections (expression_key, ts);
+            CREATE TABLE IF NOT EXISTS counters (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                expression_key TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (period, bucket, expression_key)
+            );
+        """)
+        self.conn.commit()
+
+        # Les dernières détections, rechargées depuis le disque au démarrage
+        self.recent_detections = deque(maxlen=recent_size)
+        rows = self.conn.execute(
+            "SELECT seq, data FROM detections ORDER BY seq DESC LIMIT ?", (recent_size,)
+        ).fetchall()
+        for seq, data in reversed(rows):
+            self.recent_detections.append(self.row_to_detection(seq, data))
+        self.last_seq = rows[0][0] if rows else 0
+
+    @staticmethod
+    def row_to_detection(seq, data):
+        """Reconstruit le dict de détection à partir d'une ligne de la table"""
+        detection = json.loads(data)
+        detection['seq'] = seq
+        return detection
+
+    def add(self, detection_info):
+        """Enregistre une détection et met à jour les compteurs ; retourne son numéro de séquence"""
+        ts = time.time()
+        moment = datetime.fromtimestamp(ts)
+        expr_key = detection_info['expression_key']
+        matches = detection_info.get('matches', 1)
+
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO detections (id, ts, expression_key, matches, data) VALUES (?, ?, ?, ?, ?)",
+                (detection_info['id'], ts, expr_key, matches, json.dumps(detection_info, ensure_ascii=False))
+            )
+            self.conn.executemany(
+                """INSERT INTO counters (period, bucket, expression_key, count) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (period, bucket, expression_key) DO UPDATE SET count = count + excluded.count""",
+                [(period, moment.strftime(fmt), expr_key, matches) for period, fmt in BUCKET_FORMATS.items()]
+            )
+            self.conn.commit()
+
+            detection_info['seq'] = cursor.lastrowid
+            self.last_seq = cursor.lastrowid
+            self.recent_detections.append(detection_info)
+        return detection_info['seq']
+
+    def recent(self):
+        """Les dernières détections gardées en mémoire (de la plus ancienne à la plus récente)"""
+        with self.lock:
+            return list(self.recent_detections)
+
+    def since(self, seq, limit=None):
+        """Les détections postérieures au numéro de séquence `seq` (au plus `limit`, les plus récentes)"""
+        limit = limit or self.recent_detections.maxlen
+        with self.lock:
+            # Cas courant : tout ce qui manque au client est encore en mémoire
+            if not self.recent_detections or self.recent_detections[0]['seq'] <= seq + 1:
+                newer = [d for d in self.recent_detections if d['seq'] > seq]
+                return newer[-limit:]
+
+            rows = self.conn.execute(
+                "SELECT seq, data FROM detections WHERE seq > ? ORDER BY seq DESC LIMIT ?", (seq, limit)
+            ).fetchall()
+        return [self.row_to_detection(s, data) for s, data in reversed(rows)]
+
+    def history(self, expression_key=None, before=None, limit=50):
+        """Historique paginé (du plus récent au plus ancien) ; `before` est un numéro de séquence"""
+        query = "SELECT seq, data FROM detections WHERE 1=1"
+        params = []
+        if expression_key:
+            query += " AND expression_key = ?"
+            params.append(expression_key)
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        query += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [self.row_to_detection(seq, data) for seq, data in rows]
+
+    def counts(self, period="hour", since=None, expression_key=None):
+        """Compteurs par tranche : [{'bucket', 'expression_key', 'count'}, ...]"""
+        if period not in BUCKET_FORMATS:
+            raise ValueError(f"Période inconnue: {period} (disponibles: {', '.join(BUCKET_FORMATS)})")
+
+        query = "SELECT bucket, expression_key, count FROM counters WHERE period = ?"
+        params = [period]
+        if since:
+            query += " AND bucket >= ?"
+            params.append(since)
+        if expression_key:
+            query += " AND expression_key = ?"
+            params.append(expression_key)
+        query += " ORDER BY bucket"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [{'bucket': b, 'expression_key': k, 'count': c} for b, k, c in rows]
+
+    def totals(self):
+        """Total de toutes les sessions, par expression"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT expression_key, SUM(count) FROM counters WHERE period = 'day' GROUP BY expression_key"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Ferme la base"""
+        with self.lock:
+            self.conn.close()
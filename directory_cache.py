@@ -0,0 +1,31 @@
+import threading
+from pathlib import Path
+
+
+class DirectoryListing:
+    """Liste des fichiers d'un dossier, relue seulement quand le dossier change.
+
+    L'heure de modification d'un dossier change à chaque ajout, suppression
+    ou renommage d'un fichier : tant qu'elle est identique, la liste en
+    cache est rendue sans reparcourir le dossier.
+    """
+
+    def __init__(self, directory, pattern="*"):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.mtime = None
+        self.files = []
+        self.lock = threading.Lock()
+
+    def list(self):
+        """Noms des fichiers correspondant au motif, triés"""
+        try:
+            mtime = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self.lock:
+            if mtime != self.mtime:
+                self.files = sorted(f.name for f in self.directory.glob(self.pattern))
+                self.mtime = mtime
+            return list(self.files)
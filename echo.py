@@ -0,0 +1,205 @@
+import threading
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from resampler import PolyphaseResampler, PIPELINE_RATE
+
+
+class EchoReference:
+    """Son joué par enVrai (float32 mono à PIPELINE_RATE) et son heure de début"""
+
+    def __init__(self, samples, start):
+        self.samples = samples
+        self.start = start
+        self.end = start + len(samples) / PIPELINE_RATE
+        self.gated = False
+
+
+def sound_samples(sound):
+    """Échantillons d'un son pygame décodé, en float32 mono à PIPELINE_RATE (référence d'écho)"""
+    import pygame
+
+    frequency, _, _ = pygame.mixer.get_init()
+    samples = pygame.sndarray.array(sound).astype(np.float32)
+    if samples.ndim > 1:
+        samples = samples.reshape(len(samples), -1).mean(axis=1)
+    if frequency != PIPELINE_RATE:
+        samples = PolyphaseResampler(frequency, PIPELINE_RATE).process(samples)
+    return samples
+
+
+def rms(x):
+    return float(np.sqrt(np.mean(np.square(x)))) if len(x) else 0.0
+
+
+class EchoCanceller:
+    """Retire du micro le son joué par enVrai (annulation d'écho acoustique).
+
+    Le son joué sert de référence. Au début de la première lecture, le
+    retard entre haut-parleur et micro est estimé par intercorrélation
+    (`calibration_ms` d'audio) ; ensuite un filtre adaptatif NLMS par blocs
+    (`taps` coefficients) modélise l'écho de la pièce et le soustrait.
+    Le reste d'écho est mis à zéro tant que le filtre n'a pas convergé ou
+    quand le résidu est faible devant l'écho estimé ; la parole qui couvre
+    le son joué (double parole) passe, et gèle l'adaptation.
+
+    Si le retard ne peut pas être estimé, le micro est coupé pendant la
+    lecture, comme sans annulation d'écho.
+    """
+
+    def __init__(self, taps=512, step=0.5, max_delay_ms=500, calibration_ms=500,
+                 suppression=0.5, min_erle_db=6, tail_ms=200, block=32):
+        self.taps = taps
+        self.step = step
+        self.max_delay = int(max_delay_ms * PIPELINE_RATE / 1000)
+        self.calibration = int(calibration_ms * PIPELINE_RATE / 1000)
+        self.suppression = suppression
+        self.min_erle = 10 ** (min_erle_db / 20)
+        self.tail = tail_ms / 1000
+        self.block = block
+
+        # Ajoutées par le thread de lecture, lues par le thread de capture
+        self.references = deque(maxlen=8)
+        self.references_lock = threading.Lock()
+        self.weights = np.zeros(taps, dtype=np.float32)
+        self.delay = None
+        self.erle = 1.0
+
+        # Horloge du micro : heure de l'échantillon 0 et nombre d'échantillons lus
+        self.anchor = None
+        self.mic_index = 0
+        self.pending = []
+
+    def add_reference(self, reference):
+        """Signale un son qui commence à être joué"""
+        with self.references_lock:
+            self.references.append(reference)
+
+    def active_reference(self, t0, t1):
+        """Son dont l'écho peut être présent entre t0 et t1"""
+        with self.references_lock:
+            references = list(self.references)
+        for reference in reversed(references):
+            if reference.start <= t1 and t0 <= reference.end + (self.max_delay / PIPELINE_RATE) + self.tail:
+                return reference
+        return None
+
+    def process(self, data, read_at):
+        """Traite un bloc du micro (int16 mono à PIPELINE_RATE) lu à l'heure `read_at`
+
+        Retourne le bloc débarrassé de l'écho (éventuellement vide pendant
+        l'estimation du retard), ou None si le micro doit être coupé.
+        """
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        n = len(samples)
+
+        # Horloge du micro recalée seulement en cas de trou (débordement, pause)
+        expected = None if self.anchor is None else self.anchor + (self.mic_index + n) / PIPELINE_RATE
+        if expected is None or abs(read_at - expected) > 0.1:
+            self.anchor = read_at - (self.mic_index + n) / PIPELINE_RATE
+        start_index = self.mic_index
+        self.mic_index += n
+
+        t0 = self.anchor + start_index / PIPELINE_RATE
+        reference = self.active_reference(t0, t0 + n / PIPELINE_RATE)
+        if reference is None:
+            self.pending = []
+            return data
+        if reference.gated:
+            return None
+
+        if self.delay is None:
+            self.pending.append((start_index, samples))
+            if sum(len(s) for _, s in self.pending) < self.calibration:
+                return b''
+            if not self.estimate_delay(reference):
+                # Pas d'écho reconnaissable : on coupe le micro pendant ce son
+                reference.gated = True
+                self.pending = []
+                return None
+            chunks, self.pending = self.pending, []
+        else:
+            chunks = [(start_index, samples)]
+
+        output = [self.cancel(reference, index, chunk) for index, chunk in chunks]
+        return np.clip(np.concatenate(output), -32768, 32767).astype(np.int16).tobytes()
+
+    def reference_index(self, reference, mic_index):
+        """Position dans la référence correspondant à un échantillon du micro (hors retard)"""
+        return int(round((self.anchor + mic_index / PIPELINE_RATE - reference.start) * PIPELINE_RATE))
+
+    def reference_slice(self, reference, start, end):
+        """Échantillons [start, end) de la référence, complétés par des zéros"""
+        out = np.zeros(end - start, dtype=np.float32)
+        lo, hi = max(start, 0), min(end, len(reference.samples))
+        if hi > lo:
+            out[lo - start:hi - start] = reference.samples[lo:hi]
+        return out
+
+    def estimate_delay(self, reference):
+        """Estime le retard haut-parleur → micro sur l'audio mis de côté"""
+        mic = np.concatenate([s for _, s in self.pending])
+        start = self.reference_index(reference, self.pending[0][0])
+        ref = self.reference_slice(reference, start - self.max_delay, start + len(mic))
+
+        # Corrélation pour chaque retard de 0 à max_delay
+        correlation = np.correlate(ref, mic, mode='valid')[::-1]
+        energies = np.convolve(np.square(ref), np.ones(len(mic), dtype=np.float32), mode='valid')[::-1]
+        norm = np.sqrt(energies * np.sum(np.square(mic))) + 1e-9
+        score = np.abs(correlation) / norm
+
+        lag = int(np.argmax(score))
+        if score[lag] < 0.2:
+            return False
+        # Le filtre couvre quelques ms avant le pic pour absorber l'imprécision
+        self.delay = max(0, lag - self.taps // 8)
+        return True
+
+    def reset_filter(self):
+        """Repart d'un filtre nul (le micro est coupé jusqu'à la nouvelle convergence)"""
+        self.weights = np.zeros(self.taps, dtype=np.float32)
+        self.erle = 1.0
+
+    def cancel(self, reference, mic_index, mic):
+        """Soustrait l'écho estimé d'un bloc du micro"""
+        start = self.reference_index(reference, mic_index) - self.delay
+        x = self.reference_slice(reference, start - self.taps + 1, start + len(mic))
+        # Ligne i : x[k], x[k-1], ... x[k-taps+1] pour l'échantillon k = i
+        windows = sliding_window_view(x, self.taps)[:, ::-1]
+
+        out = np.empty_like(mic)
+        for b in range(0, len(mic), self.block):
+            X = windows[b:b + self.block]
+            d = mic[b:b + self.block]
+            y = X @ self.weights
+            e = d - y
+
+            rms_d, rms_e, rms_y = rms(d), rms(e), rms(y)
+            converged = self.erle >= self.min_erle
+            double_talk = converged and rms_e > rms_y
+
+            # Adaptation NLMS, gelée pendant la double parole : le gradient du
+            # bloc est la somme de len(d) gradients, d'où la normalisation par
+            # l'énergie totale du bloc (et non par sa moyenne)
+            energy = float(np.einsum('ij,ij->', X, X))
+            power = energy / len(d)
+            if power > 1e-3 and not double_talk:
+                self.weights += self.step * (X.T @ e) / energy
+                if rms_y > 1.0:
+                    self.erle = 0.9 * self.erle + 0.1 * (rms_d / max(rms_e, 1e-3))
+
+            # Filtre divergent : il ajoute de l'écho au lieu d'en retirer
+            if not np.all(np.isfinite(self.weights)) or (rms_d > 1.0 and rms_e > 4 * rms_d):
+                self.reset_filter()
+                e, rms_e, rms_y = d, rms_d, 0.0
+                converged = False
+
+            if power <= 1e-3 and rms_y <= 1.0:
+                out[b:b + self.block] = e
+            elif not converged or rms_e < self.suppression * rms_y:
+                out[b:b + self.block] = 0
+            else:
+                out[b:b + self.block] = e
+        return out
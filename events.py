@@ -0,0 +1,43 @@
+import queue
+import threading
+
+
+class EventBus:
+    """Diffusion d'événements vers les clients web abonnés (flux SSE).
+
+    Chaque abonné reçoit sa propre file bornée ; un client trop lent perd
+    les événements en trop au lieu de bloquer la détection.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Crée une file d'événements pour un nouveau client"""
+        subscriber = queue.Queue(maxsize=self.max_pending)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Retire un client (connexion fermée)"""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, data, event_id=None):
+        """Envoie un événement à tous les clients abonnés"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data, event_id))
+            except queue.Full:
+                pass
+
+    def subscriber_count(self):
+        """Nombre de clients connectés"""
+        with self.lock:
+            return len(self.subscribers)
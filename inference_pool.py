@@ -0,0 +1,296 @@
+"""Transcription dans des processus séparés (hors du GIL du processus de capture).
+
+Chaque processus charge son propre modèle. L'audio ne passe pas par les
+files : il est copié dans un emplacement d'une mémoire partagée (ring de
+`slots` emplacements) et seul son numéro est envoyé. Le texte et les mots
+reviennent par une file de résultats.
+"""
+
+import collections
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from asr_backends import create_backend
+from resampler import PIPELINE_RATE
+
+
+def worker_main(index, config, shm_name, shape, requests, results, cores):
+    """Boucle d'un processus d'inférence"""
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    # (le suivi des ressources est celui du processus principal, qui seul la supprime)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        backend = create_backend(config)
+        backend.load()
+    except Exception as e:
+        results.put(('ready', index, str(e)))
+        shm.close()
+        return
+    results.put(('ready', index, None))
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            job_id, slot, length, payload, want_words, prompt = request
+            audio = payload if payload is not None else slots[slot, :length].copy()
+            try:
+                words = [] if want_words else None
+                text = backend.transcribe(audio, words=words, prompt=prompt)
+                results.put(('done', job_id, text, words, None))
+            except Exception as e:
+                results.put(('done', job_id, None, None, str(e)))
+    finally:
+        del slots
+        shm.close()
+
+
+class InferenceJob:
+    """Transcription confiée à un processus, en attente de son résultat"""
+
+    def __init__(self, request):
+        self.request = request
+        self.done = threading.Event()
+        self.text = None
+        self.words = None
+        self.error = None
+
+
+class InferencePool:
+    """Processus d'inférence partageant une file de segments.
+
+    Même interface que `BatchingTranscriber` (`transcribe`, `close`). Chaque
+    processus traite un segment à la fois : le suivant part vers le premier
+    processus libre, ce qui permet de savoir lequel traitait quoi. Chacun peut être
+    attaché à des cœurs (`cpu_affinity`, un jeu de cœurs par processus). Un
+    processus qui plante est relancé sans interrompre la capture : seul le
+    segment qu'il traitait est perdu. Un segment plus long que `slot_seconds`
+    passe exceptionnellement par la file.
+    """
+
+    def __init__(self, config, processes=1, cpu_affinity=None, slot_seconds=30, on_batch=None):
+        self.config = config
+        self.processes = max(1, processes)
+        self.cpu_affinity = cpu_affinity or []
+        self.on_batch = on_batch
+
+        # Deux emplacements par processus : un en cours, un prêt à partir
+        self.shape = (2 * self.processes, int(slot_seconds * PIPELINE_RATE))
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * 4)
+        self.slots = np.ndarray(self.shape, dtype=np.float32, buffer=self.shm.buf)
+        self.free_slots = queue.Queue()
+        for slot in range(self.shape[0]):
+            self.free_slots.put(slot)
+
+        self.context = multiprocessing.get_context("spawn")
+        self.results = self.context.Queue()
+        self.workers = [None] * self.processes
+        self.requests = [None] * self.processes
+        self.ready = [threading.Event() for _ in range(self.processes)]
+        self.load_errors = {}
+
+        # Segments en attente d'un processus libre, et segment en cours de chaque processus
+        self.waiting = collections.deque()
+        self.running = {}
+        self.jobs = {}
+        self.job_ids = itertools.count()
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.closed = False
+        self.dispatcher = None
+
+    def start(self):
+        """Lance les processus et attend qu'ils aient chargé le modèle"""
+        for index in range(self.processes):
+            self.spawn(index)
+        self.dispatcher = threading.Thread(target=self.dispatch, name="inference-results", daemon=True)
+        self.dispatcher.start()
+
+        # `ready` est aussi levé en cas d'échec (voir `fail_loading`)
+        for ready in self.ready:
+            ready.wait()
+        if self.load_errors:
+            self.close()
+            raise RuntimeError(next(iter(self.load_errors.values())))
+
+    def spawn(self, index):
+        cores = None
+        if self.cpu_affinity:
+            cores = self.cpu_affinity[index % len(self.cpu_affinity)]
+            cores = set(cores) if isinstance(cores, list) else {cores}
+        # Nouvelle file à chaque lancement : celle d'un processus arrêté brutalement n'est plus fiable
+        self.requests[index] = self.context.Queue()
+        self.ready[index].clear()
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self.config, self.shm.name, self.shape, self.requests[index], self.results, cores),
+            name=f"asr-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.workers[index] = process
+
+    def transcribe(self, audio, words=None, prompt=None):
+        """Transcrit un segment dans un processus (bloque jusqu'au résultat)"""
+        if self.closed:
+            raise RuntimeError("processus d'inférence arrêtés")
+        if self.on_batch:
+            self.on_batch(1)
+
+        audio = np.asarray(audio, dtype=np.float32)
+        slot = self.free_slots.get()
+        try:
+            payload = None
+            if len(audio) <= self.shape[1]:
+                self.slots[slot, :len(audio)] = audio
+            else:
+                payload = audio
+
+            with self.lock:
+                job_id = next(self.job_ids)
+                job = InferenceJob((job_id, slot, len(audio), payload, words is not None, prompt))
+                self.jobs[job_id] = job
+                self.waiting.append(job_id)
+                self.schedule()
+
+            job.done.wait()
+        finally:
+            self.free_slots.put(slot)
+
+        if job.error:
+            raise RuntimeError(job.error)
+        if words is not None and job.words:
+            words.extend(job.words)
+        return job.text
+
+    def schedule(self):
+        """Envoie les segments en attente aux processus libres (appelé sous `lock`)"""
+        for index, process in enumerate(self.workers):
+            if not self.waiting:
+                return
+            if index in self.running or not self.ready[index].is_set() or index in self.load_errors:
+                continue
+            if process is None or not process.is_alive():
+                continue
+            job_id = self.waiting.popleft()
+            self.running[index] = job_id
+            self.requests[index].put(self.jobs[job_id].request)
+
+    def finish(self, job_id, text=None, words=None, error=None):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+            for index, running in list(self.running.items()):
+                if running == job_id:
+                    del self.running[index]
+            self.schedule()
+        if job:
+            job.text, job.words, job.error = text, words, error
+            job.done.set()
+
+    def dispatch(self):
+        """Reçoit les résultats et relance les processus qui se sont arrêtés"""
+        while True:
+            try:
+                message = self.results.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                return
+
+            if message is not None:
+                kind = message[0]
+                if kind == 'stop':
+                    return
+                if kind == 'ready':
+                    _, index, error = message
+                    if error:
+                        self.fail_loading(index, error)
+                    else:
+                        with self.lock:
+                            self.ready[index].set()
+                            self.schedule()
+                elif kind == 'done':
+                    _, job_id, text, words, error = message
+                    self.finish(job_id, text, words, error)
+
+            if not self.closed:
+                self.check_workers()
+
+    def check_workers(self):
+        for index, process in enumerate(self.workers):
+            if process is None or process.is_alive() or index in self.load_errors:
+                continue
+            if not self.ready[index].is_set():
+                # Arrêté pendant le chargement du modèle : le relancer échouerait pareil
+                self.fail_loading(index, f"processus d'inférence {index} arrêté pendant le chargement "
+                                         f"(code {process.exitcode})")
+                continue
+            print(f"⚠️ Processus d'inférence {index} arrêté (code {process.exitcode}), redémarrage")
+            with self.lock:
+                self.restarts += 1
+                self.spawn(index)
+                job_id = self.running.pop(index, None)
+            if job_id is not None:
+                self.finish(job_id, error=f"processus d'inférence {index} arrêté")
+
+    def fail_loading(self, index, error):
+        """Un processus n'a pas pu charger le modèle ; sans aucun processus valide, les segments échouent"""
+        print(f"❌ {error}")
+        with self.lock:
+            self.load_errors[index] = error
+            self.ready[index].set()
+            abandoned = []
+            if len(self.load_errors) == self.processes:
+                abandoned = list(self.waiting)
+                self.waiting.clear()
+        for job_id in abandoned:
+            self.finish(job_id, error=error)
+
+    def close(self):
+        """Arrête les processus une fois les segments en attente traités (10 s au plus)"""
+        if self.closed:
+            return
+        self.closed = True
+        deadline = time.monotonic() + 10
+        while (self.waiting or self.running) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        for index, process in enumerate(self.workers):
+            if process is not None:
+                self.requests[index].put(None)
+        for process in self.workers:
+            if process is None:
+                continue
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+
+        # Les segments encore en attente ne seront pas transcrits
+        with self.lock:
+            pending = list(self.jobs)
+        for job_id in pending:
+            self.finish(job_id, error="processus d'inférence arrêtés")
+        self.results.put(('stop',))
+
+        del self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+    def get_stats(self):
+        return {
+            'processes': self.processes,
+            'alive': sum(1 for process in self.workers if process and process.is_alive()),
+            'busy': len(self.running),
+            'restarts': self.restarts
+        }
@@ -0,0 +1,134 @@
+import random
+import threading
+
+from matcher import ExpressionMatcher
+
+HIT = 'hit'
+SAMPLED = 'sampled'
+SKIPPED = 'skipped'
+
+
+class KeywordSpotter:
+    """Premier filtre, peu coûteux, avant la transcription complète.
+
+    Un petit modèle (`tiny` par défaut) transcrit grossièrement le segment,
+    en étant orienté vers le vocabulaire des expressions (les patterns lui
+    sont donnés comme contexte). Ses erreurs sont absorbées par une
+    correspondance approximative plus tolérante que celle de la détection
+    (`distance` erreurs, même sur les expressions courtes). Seuls les
+    segments où une expression est probable passent au modèle principal,
+    plus une fraction `sample_rate` des autres, tirée au hasard, pour
+    mesurer ce que le filtre laisse passer : `record` reçoit le résultat de
+    la transcription complète, d'où une estimation du rappel du filtre.
+
+    Plus `distance` est grande, moins le filtre rate d'expressions, mais
+    plus il envoie de segments au modèle principal.
+
+    Le contexte donné au modèle est limité à `prompt_chars` caractères
+    (Whisper ne garde que la fin d'un contexte trop long) : les expressions
+    les plus détectées (`popularity()`, nombre de détections par
+    expression) passent en premier, puis celles de la config, dans l'ordre.
+    """
+
+    def __init__(self, backend, distance=2, sample_rate=0.0, bias_prompt=True, prompt_chars=400,
+                 popularity=None):
+        self.backend = backend
+        self.distance = distance
+        self.sample_rate = sample_rate
+        self.bias_prompt = bias_prompt
+        self.prompt_chars = prompt_chars
+        self.popularity = popularity
+
+        self.version = None
+        self.matcher = None
+        self.expressions = {}
+        self.counts = {HIT: 0, SAMPLED: 0, SKIPPED: 0}
+        # Segments transcrits après le filtre où une expression a bien été détectée
+        self.confirmed = {HIT: 0, SAMPLED: 0}
+        self.lock = threading.Lock()
+
+    def update(self, snapshot):
+        """Suit les expressions de la version de configuration `snapshot`"""
+        with self.lock:
+            if snapshot.version != self.version:
+                self.expressions = {
+                    expr_key: dict(expr_config, fuzzy=True,
+                                   fuzzy_distance=max(self.distance, expr_config.get("fuzzy_distance", 1)))
+                    for expr_key, expr_config in snapshot.expressions.items()
+                }
+                self.matcher = (self.matcher.updated(self.expressions) if self.matcher
+                                else ExpressionMatcher(self.expressions, lenient=True))
+                self.version = snapshot.version
+            matcher, expressions = self.matcher, self.expressions
+        return matcher, self.build_prompt(expressions) if self.bias_prompt else None
+
+    def build_prompt(self, expressions):
+        """Patterns des expressions actives, les plus détectées d'abord, dans la limite de `prompt_chars`"""
+        counts = self.popularity() if self.popularity else {}
+        ranked = sorted((expr_key for expr_key, expr in expressions.items() if expr.get("enabled", True)),
+                        key=lambda expr_key: -counts.get(expr_key, 0))
+        patterns, length = [], 0
+        for expr_key in ranked:
+            for pattern in expressions[expr_key].get("patterns", []):
+                if pattern in patterns:
+                    continue
+                if length + len(pattern) + 2 > self.prompt_chars:
+                    return ", ".join(patterns) or None
+                patterns.append(pattern)
+                length += len(pattern) + 2
+        return ", ".join(patterns) or None
+
+    def check(self, audio, snapshot, accepts=None):
+        """Retourne `hit`, `sampled` ou `skipped` pour un segment (float32 mono 16 kHz)
+
+        `accepts(expr_key)` limite les expressions qui comptent (celles de la pièce).
+        """
+        matcher, prompt = self.update(snapshot)
+        text = self.backend.transcribe(audio, prompt=prompt)
+        found = [expr_key for expr_key in matcher.find(text) if accepts is None or accepts(expr_key)]
+
+        if found:
+            verdict = HIT
+        elif self.sample_rate and random.random() < self.sample_rate:
+            verdict = SAMPLED
+        else:
+            verdict = SKIPPED
+        with self.lock:
+            self.counts[verdict] += 1
+        return verdict
+
+    def record(self, verdict, found):
+        """Résultat de la transcription complète d'un segment que le filtre a laissé passer"""
+        if verdict in self.confirmed and found:
+            with self.lock:
+                self.confirmed[verdict] += 1
+
+    def describe(self):
+        return self.backend.describe()
+
+    def estimated_recall(self, counts, confirmed):
+        """Part des segments avec une expression que le filtre laisse passer (estimation)
+
+        Les segments tirés au hasard représentent tous ceux que le filtre a
+        écartés : ceux où une expression a été détectée, ramenés à la part
+        tirée, estiment les segments manqués.
+        """
+        if not counts[SAMPLED]:
+            return None
+        missed = confirmed[SAMPLED] * (counts[SAMPLED] + counts[SKIPPED]) / counts[SAMPLED]
+        total = confirmed[HIT] + missed
+        return round(confirmed[HIT] / total, 3) if total else None
+
+    def get_stats(self):
+        """Segments filtrés, part des transcriptions complètes évitées et rappel estimé"""
+        with self.lock:
+            counts = dict(self.counts)
+            confirmed = dict(self.confirmed)
+        total = sum(counts.values())
+        return {
+            'model': self.describe(),
+            **counts,
+            'sampled_with_expression': confirmed[SAMPLED],
+            'saved_ratio': round(counts[SKIPPED] / total, 3) if total else None,
+            'estimated_recall': self.estimated_recall(counts, confirmed)
+        }
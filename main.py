@@ -1,58 +1,195 @@
-import whisper
-import pyaudio
 import wave
 import threading
 import time
 import numpy as np
-from collections import deque
 import tempfile
 import os
 import json
-import re
 from datetime import datetime
 import argparse
 import sys
-import pygame
 import uuid
 from pathlib import Path
 import webrtcvad
+from segmenter import UtteranceSegmenter, frame_levels
+from resampler import CaptureConverter, PIPELINE_RATE
+from segment_queue import SegmentQueue
+from model_manager import ModelManager
+from asr_backends import create_backend
+from keyword_spotter import KeywordSpotter, SKIPPED
+from matcher import normalize_text
+from config_store import ConfigStore
+from recording_store import RecordingStore
+from detection_log import DetectionLog
+from events import EventBus
+from audio_sources import MicrophoneSource
+from metrics import MetricsRegistry
+from playback import PlaybackEngine
+from echo import EchoCanceller, EchoReference, sound_samples
+from rooms import load_rooms
+from startup import StartupTracker
+from control_queue import ControlQueue
+from directory_cache import DirectoryListing
+from streaming import StreamingDecoder
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='pygame.*')
 
 class TicDetectorApp:
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file="config.json", live=True, load_model=True, background=False):
+        """`background` : le micro et le modèle sont initialisés dans un thread,
+        pour que l'interface web réponde tout de suite (voir `startup`)."""
         self.config_file = config_file
+        self.live = live
         self.load_config()
         
         # Initialisation
         self.audio = None
-        self.model = None
         self.is_recording = False
-        self.is_playing = False
         
         # Stockage des enregistrements
         self.recordings_dir = Path("recordings")
-        self.recordings_dir.mkdir(exist_ok=True)
+        self.recording_store = RecordingStore(self.recordings_dir, self.config.get("recording_config", {}))
         self.mp3_dir = Path("mp3")
         self.mp3_dir.mkdir(exist_ok=True)
+        self.mp3_listing = DirectoryListing(self.mp3_dir, "*.mp3")
         
-        # Anti-doublon
-        self.last_detections = deque(maxlen=10)
+        # Pièces écoutées (une entrée audio chacune, modèle partagé)
+        self.rooms = load_rooms(self.config)
+        self.default_room = next(iter(self.rooms.values()))
         
         # Statistiques
         self.detection_stats = {expr: 0 for expr in self.config["expressions"]}
-        self.session_detections = []
+        self.stats_lock = threading.Lock()
+        self.events = EventBus()
+        # Actions demandées depuis l'interface web, exécutées hors des requêtes
+        self.controls = ControlQueue(on_change=lambda job: self.events.publish('job', job))
+        log_config = self.config.get("log_config", {})
+        # Hors écoute réelle (benchmark), l'historique n'est pas conservé
+        self.detection_log = DetectionLog(
+            log_config.get("database", "detections.db") if self.live else ":memory:",
+            recent_size=log_config.get("recent_size", 200)
+        )
+        
+        # File bornée des segments à transcrire
+        # (en inférence par lots ou par processus, il faut au moins autant de workers que de segments traités à la fois)
+        processing_config = self.config.get("processing_config", {})
+        asr_config = self.config.get("asr_config", {})
+        self.segment_queue = SegmentQueue(
+            self.process_audio_segment,
+            workers=max(processing_config.get("workers", 1), asr_config.get("batch_size", 1),
+                        asr_config.get("processes", 0)),
+            max_size=processing_config.get("queue_size", 8),
+            drop_policy=processing_config.get("drop_policy", "drop_oldest")
+        )
+        
+        # Métriques (/api/metrics)
+        self.setup_metrics()
+        
+        # Modèles ASR : le modèle actif, et les précédents gardés en cache
+        self.models = ModelManager(
+            cache_size=self.config.get("asr_config", {}).get("model_cache_size", 2),
+            on_batch=self.batch_sizes.observe,
+            on_change=lambda state: self.events.publish('model', state)
+        )
         
         # VAD - Nouveau
+        self.vad_generation = 0
         self.setup_vad()
         
-        # Initialisation des composants
+        # Lecture des sons (MP3 et replays), sans bloquer la détection
+        playback_config = self.config.get("playback_config", {})
+        self.playback = PlaybackEngine(
+            cache_size=playback_config.get("cache_size", 16),
+            on_start=self.on_playback_start,
+            on_end=self.on_playback_end,
+            prepare=self.echo_samples
+        )
+        # Annulation d'écho : un filtre par flux micro, tous informés des sons joués
+        self.echo_cancellers = set()
+        self.echo_lock = threading.Lock()
+        
+        # Filtre par mots-clés avant le modèle principal (optionnel, chargé avec le modèle)
+        self.spotter = None
+        self.spotter_generation = 0
+        
+        # Démarrage par étapes, suivi par /api/health
+        self.startup = StartupTracker(['audio', 'model', 'warmup'],
+                                      on_change=lambda state: self.events.publish('startup', state))
+        if background:
+            threading.Thread(target=self.initialize, args=(load_model,), name="startup", daemon=True).start()
+        elif not self.initialize(load_model):
+            sys.exit(1)
+    
+    def initialize(self, load_model=True):
+        """Initialise le son, le micro puis le modèle (préchauffé) ; retourne False en cas d'échec"""
+        try:
+            # Pas de micro ni de son hors écoute réelle
+            if self.live:
+                with self.startup.stage('audio'):
+                    self.init_components()
+            else:
+                self.startup.skip('audio')
+            
+            if load_model:
+                with self.startup.stage('model'):
+                    if not self.load_whisper_model():
+                        raise RuntimeError("modèle non chargé")
+                    self.setup_spotter()
+                with self.startup.stage('warmup'):
+                    self.warm_up_model()
+            else:
+                self.startup.skip('model')
+                self.startup.skip('warmup')
+            return True
+            
+        except Exception as e:
+            print(f"❌ Démarrage impossible: {e}")
+            return False
+    
+    def init_components(self):
+        """Initialise le mixer (sons préchargés) et le micro"""
+        import pygame
         pygame.mixer.init()
+        self.playback.preload(self.expression_mp3_paths())
         
         if not self.init_audio():
-            sys.exit(1)
-        if not self.load_whisper_model():
-            sys.exit(1)
+            raise RuntimeError("micro indisponible")
+    
+    def setup_metrics(self):
+        """Déclare les métriques du pipeline exposées au format Prometheus"""
+        self.metrics = MetricsRegistry()
+        self.stage_latency = self.metrics.histogram(
+            'envrai_stage_duration_seconds', "Durée de chaque étape du pipeline", ['stage'])
+        self.segments_total = self.metrics.counter(
+            'envrai_segments_total', "Segments audio traités, par issue", ['outcome', 'source'])
+        self.detections_total = self.metrics.counter(
+            'envrai_detections_total', "Expressions détectées", ['expression', 'source'])
+        self.audio_reads_total = self.metrics.counter(
+            'envrai_audio_reads_total', "Blocs audio lus sur le micro")
+        self.audio_overflows_total = self.metrics.counter(
+            'envrai_audio_overflows_total', "Débordements du buffer d'entrée (échantillons perdus)")
+        self.metrics.gauge('envrai_model_load_seconds', "Durée du dernier chargement de modèle").set_function(
+            lambda: self.models.last_load_seconds or 0)
+        self.spotter_total = self.metrics.counter(
+            'envrai_spotter_segments_total', "Segments vus par le filtre par mots-clés, par verdict", ['verdict'])
+        self.batch_sizes = self.metrics.histogram(
+            'envrai_asr_batch_size', "Nombre de segments par appel au modèle", buckets=(1, 2, 4, 8, 16))
+        
+        # Jauges calculées uniquement au moment de la lecture
+        self.metrics.gauge('envrai_queue_depth', "Segments en attente de transcription").set_function(
+            lambda: self.segment_queue.get_stats()['depth'])
+        self.metrics.gauge('envrai_active_workers', "Workers en cours de transcription").set_function(
+            lambda: self.segment_queue.get_stats()['active_workers'])
+        self.metrics.gauge('envrai_queue_dropped', "Segments jetés car la file était pleine").set_function(
+            lambda: self.segment_queue.get_stats()['dropped'])
+        self.metrics.gauge('envrai_audio_lag_seconds', "Retard de la transcription sur le temps réel").set_function(
+            lambda: self.segment_queue.get_stats()['lag_seconds'])
+        self.metrics.gauge('envrai_event_subscribers', "Clients web connectés au flux SSE").set_function(
+            self.events.subscriber_count)
+    
+    def observe_stage(self, stage, start):
+        """Enregistre la durée d'une étape commencée à `start` (perf_counter)"""
+        self.stage_latency.labels(stage).observe(time.perf_counter() - start)
     
     def setup_vad(self):
         """Initialise le détecteur d'activité vocale en lisant la config."""
@@ -65,6 +202,9 @@ class TicDetectorApp:
             
             self.vad_enabled = vad_config.get("enabled", True)
             
+            # Les threads d'écoute reconstruisent leur découpeur au prochain bloc
+            self.vad_generation += 1
+            
             if not self.vad_enabled:
                 print("🎤 VAD est désactivé dans la configuration.")
                 return
@@ -74,10 +214,8 @@ class TicDetectorApp:
                 print(f"⚠️ Agressivité VAD invalide ({aggressiveness}), utilisation de la valeur 2 par défaut.")
                 aggressiveness = 2
 
-            self.vad = webrtcvad.Vad(aggressiveness)
-            self.vad_frame_duration = 30
-            self.vad_frame_size = int(16000 * self.vad_frame_duration / 1000)
-            self.voice_threshold = 0.3
+            # Les découpeurs ont chacun leur VAD : on vérifie seulement que webrtcvad est utilisable
+            webrtcvad.Vad(aggressiveness)
             
             print(f"🎤 VAD initialisé - Agressivité: {aggressiveness}, État: {'Activé' if self.vad_enabled else 'Désactivé'}")
 
@@ -85,51 +223,30 @@ class TicDetectorApp:
             print(f"⚠️ VAD non disponible: {e}")
             self.vad_enabled = False
     
-    def has_voice_activity(self, audio_data):
-        """Détecte s'il y a de l'activité vocale dans l'audio"""
-        if not self.vad_enabled:
-            return True  # Si VAD désactivé, traiter tout
+    def create_segmenter(self):
+        """Crée un découpeur d'énoncés à partir de la configuration VAD"""
+        vad_config = self.config.get("vad_config", {})
+        aggressiveness = vad_config.get("aggressiveness", 2)
+        if not 0 <= aggressiveness <= 3:
+            aggressiveness = 2
         
-        try:
-            # Convertir au format requis par webrtcvad (16kHz, mono, int16)
-            audio_np = np.frombuffer(audio_data, dtype=np.int16)
-            
-            # Rééchantillonner à 16kHz si nécessaire
-            current_rate = self.config["audio_config"]["rate"]
-            if current_rate != 16000:
-                # Rééchantillonnage simple
-                ratio = 16000 / current_rate
-                new_length = int(len(audio_np) * ratio)
-                audio_np = np.interp(np.linspace(0, len(audio_np), new_length), 
-                                   np.arange(len(audio_np)), audio_np).astype(np.int16)
-            
-            # Analyser par frames de 30ms
-            voice_frames = 0
-            total_frames = 0
-            
-            for i in range(0, len(audio_np) - self.vad_frame_size + 1, self.vad_frame_size):
-                frame = audio_np[i:i + self.vad_frame_size]
-                
-                if len(frame) == self.vad_frame_size:
-                    total_frames += 1
-                    if self.vad.is_speech(frame.tobytes(), 16000):
-                        voice_frames += 1
-            
-            if total_frames == 0:
-                return False
-            
-            voice_ratio = voice_frames / total_frames
-            return voice_ratio >= self.voice_threshold
-            
-        except Exception as e:
-            print(f"⚠️ Erreur VAD: {e}")
-            return True  # En cas d'erreur, traiter quand même
+        return UtteranceSegmenter(
+            aggressiveness=aggressiveness,
+            padding_ms=vad_config.get("padding_ms", 300),
+            silence_ms=vad_config.get("silence_ms", 600),
+            max_utterance_seconds=vad_config.get("max_utterance_seconds", 10),
+            min_utterance_ms=vad_config.get("min_utterance_ms", 300)
+        )
     
     def load_config(self):
-        """Charge la configuration depuis le fichier JSON"""
+        """Charge la configuration depuis le fichier JSON
+        
+        Elle est ensuite partagée en versions figées (voir `ConfigStore`) :
+        chaque segment traite avec une seule version, même si l'interface web
+        la modifie pendant ce temps.
+        """
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+            self.config_store = ConfigStore.load(self.config_file)
         except FileNotFoundError:
             print(f"❌ Fichier de configuration {self.config_file} non trouvé")
             sys.exit(1)
@@ -137,58 +254,190 @@ class TicDetectorApp:
             print(f"❌ Erreur dans le fichier de configuration: {e}")
             sys.exit(1)
     
+    @property
+    def config(self):
+        """Version courante de la configuration (ne pas la modifier : passer par `update_config`)"""
+        return self.config_store.current.data
+    
+    @property
+    def matcher(self):
+        """Matcher compilé pour les expressions de la version courante"""
+        return self.config_store.current.matcher
+    
+    def update_config(self, mutate, save=True):
+        """Modifie la configuration via `mutate(config)` ; sauvegarde différée et atomique"""
+        return self.config_store.update(mutate, save)
+    
     def save_config(self):
-        """Sauvegarde la configuration"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
+        """Sauvegarde tout de suite une modification en attente"""
+        self.config_store.flush()
     
     def init_audio(self):
-        """Initialise PyAudio"""
+        """Initialise PyAudio et vérifie le micro de chaque pièce"""
+        import pyaudio
         try:
             self.audio = pyaudio.PyAudio()
             
-            # Test du microphone
-            test_stream = self.audio.open(
-                format=getattr(pyaudio, self.config["audio_config"]["format"]),
-                channels=self.config["audio_config"]["channels"],
-                rate=self.config["audio_config"]["rate"],
-                input=True,
-                frames_per_buffer=self.config["audio_config"]["chunk"]
-            )
-            test_stream.close()
+            # Test des microphones
+            for room in self.rooms.values():
+                audio_config = room.audio_config
+                test_stream = self.audio.open(
+                    format=getattr(pyaudio, audio_config["format"]),
+                    channels=audio_config["channels"],
+                    rate=audio_config["rate"],
+                    input=True,
+                    input_device_index=audio_config.get("device_index"),
+                    frames_per_buffer=audio_config["chunk"]
+                )
+                test_stream.close()
+                print(f"✅ Microphone '{room.name}' détecté et fonctionnel")
             
-            print("✅ Microphone détecté et fonctionnel")
             return True
             
         except Exception as e:
             print(f"❌ Erreur audio: {e}")
             return False
     
+    @property
+    def model(self):
+        """Moteur ASR actif (None tant qu'aucun modèle n'est chargé)"""
+        active = self.models.active
+        return active.backend if active else None
+    
     def load_whisper_model(self):
-        """Charge le modèle Whisper"""
+        """Charge et active le modèle Whisper avec le moteur ASR choisi dans la config"""
         try:
-            model_size = self.config["whisper_model"]
-            print(f"📥 Chargement du modèle Whisper '{model_size}'...")
-            self.model = whisper.load_model(model_size)
-            print(f"✅ Modèle {model_size} chargé")
+            self.models.activate(self.models.build(self.config))
             return True
             
         except Exception as e:
             print(f"❌ Erreur Whisper: {e}")
             return False
     
-    def save_audio_segment(self, audio_data, detection_info):
-        """Sauvegarde un segment audio qui a déclenché une détection"""
+    def warm_up_model(self):
+        """Préchauffe le modèle actif"""
+        self.models.warm_up(self.models.active)
+    
+    def switch_model(self):
+        """Passe au modèle de la config sans interrompre la détection (chargement en arrière-plan)"""
+        self.models.switch(self.config)
+    
+    def reload_spotter(self):
+        """Recharge le filtre par mots-clés dans son propre thread (un téléchargement de modèle
+        ne retarde ni les actions de contrôle ni la détection, qui garde l'ancien filtre)"""
+        threading.Thread(target=self.setup_spotter, name="spotter-loader", daemon=True).start()
+    
+    def setup_spotter(self):
+        """Charge le filtre par mots-clés s'il est activé dans la config (sinon le retire)
+        
+        En cas d'échec, la détection continue sans filtre. Si la config change
+        pendant un chargement, seul le dernier chargement demandé est gardé.
+        """
+        self.spotter_generation += 1
+        generation = self.spotter_generation
+        spotter_config = self.config.get("spotter_config", {})
+        if not spotter_config.get("enabled", False):
+            self.spotter = None
+            return
+        
         try:
-            filename = f"{detection_info['id']}.wav"
-            filepath = self.recordings_dir / filename
+            asr_config = self.config.get("asr_config", {})
+            backend = create_backend({
+                "whisper_model": spotter_config.get("model", "tiny"),
+                "asr_config": dict(asr_config, engine=spotter_config.get("engine", asr_config.get("engine", "whisper")))
+            })
+            print(f"📥 Chargement du filtre par mots-clés {backend.describe()}...")
+            backend.load()
+            spotter = KeywordSpotter(
+                backend,
+                distance=spotter_config.get("distance", 2),
+                sample_rate=spotter_config.get("sample_rate", 0.05),
+                bias_prompt=spotter_config.get("bias_prompt", True),
+                prompt_chars=spotter_config.get("prompt_chars", 400),
+                popularity=self.detection_stats_snapshot
+            )
+            if generation != self.spotter_generation:
+                return
+            self.spotter = spotter
+            print(f"✅ Filtre par mots-clés {backend.describe()} prêt")
+        except Exception as e:
+            if generation == self.spotter_generation:
+                self.spotter = None
+            print(f"⚠️ Filtre par mots-clés indisponible ({e}), tous les segments sont transcrits")
+    
+    def get_audio_duration(self, audio_data):
+        """Durée (en secondes) d'un segment PCM (int16 mono à PIPELINE_RATE)"""
+        return len(audio_data) / (2 * PIPELINE_RATE)
+    
+    def extract_clip(self, audio_data, clip):
+        """Découpe le passage (début, fin) en secondes du segment, avec la marge configurée"""
+        padding = self.config.get("recording_config", {}).get("clip_padding_ms", 400) / 1000
+        
+        total_samples = len(audio_data) // 2
+        start = max(0, int((clip[0] - padding) * PIPELINE_RATE))
+        end = min(total_samples, int((clip[1] + padding) * PIPELINE_RATE))
+        if end <= start:
+            return audio_data
+        return audio_data[start * 2:end * 2]
+    
+    def locate_expression(self, expr_key, text, span, words, duration, snapshot=None):
+        """Estime où (en secondes) l'expression a été dite dans le segment
+        
+        Avec les horodatages de mots de Whisper, on retrouve les mots
+        correspondants ; sinon on répartit le texte proportionnellement sur la
+        durée du segment. Retourne None si on garde le segment entier.
+        """
+        snapshot = snapshot or self.config_store.current
+        clip_mode = snapshot.data.get("recording_config", {}).get("clip_mode", "estimate")
+        if clip_mode == "segment":
+            return None
+        
+        if words:
+            # Texte normalisé reconstruit mot à mot, avec la position de chaque mot
+            word_text = ""
+            word_spans = []
+            for word in words:
+                normalized = normalize_text(word['word'])
+                if not normalized:
+                    continue
+                if word_text:
+                    word_text += " "
+                word_spans.append((len(word_text), len(word_text) + len(normalized), word))
+                word_text += normalized
             
-            wf = wave.open(str(filepath), 'wb')
-            wf.setnchannels(self.config["audio_config"]["channels"])
-            wf.setsampwidth(self.audio.get_sample_size(getattr(pyaudio, self.config["audio_config"]["format"])))
-            wf.setframerate(self.config["audio_config"]["rate"])
-            wf.writeframes(audio_data)
-            wf.close()
+            found = snapshot.matcher.find(word_text).get(expr_key)
+            if found:
+                start, end = found[0]
+                matched = [w for s, e, w in word_spans if s < end and e > start]
+                if matched:
+                    return (matched[0]['start'], matched[-1]['end'])
+        
+        # Alignement approximatif : position du texte trouvé rapportée à la durée
+        normalized_length = len(normalize_text(text))
+        if not normalized_length:
+            return None
+        return (span[0] / normalized_length * duration, span[1] / normalized_length * duration)
+    
+    def save_audio_segment(self, audio_data, detection_info, clip=None):
+        """Sauvegarde le passage audio qui a déclenché une détection (tout le segment si `clip` est None)"""
+        start = time.perf_counter()
+        try:
+            if clip:
+                audio_data = self.extract_clip(audio_data, clip)
+                detection_info['clip_start'] = round(clip[0], 2)
+                detection_info['clip_end'] = round(clip[1], 2)
+            
+            filename = self.recording_store.save(
+                detection_info['id'],
+                audio_data,
+                rate=PIPELINE_RATE,
+                channels=1,
+                sample_width=2,
+                metadata={
+                    'expression_key': detection_info['expression_key'],
+                    'timestamp': detection_info['timestamp']
+                }
+            )
             
             detection_info['audio_file'] = filename
             return filename
@@ -196,169 +445,276 @@ class TicDetectorApp:
         except Exception as e:
             print(f"❌ Erreur sauvegarde audio: {e}")
             return None
+        finally:
+            self.observe_stage('save', start)
     
-    def play_mp3(self, mp3_file):
-        """Joue un fichier MP3"""
-        try:
-            mp3_path = self.mp3_dir / mp3_file
-            if mp3_path.exists():
-                self.is_playing = True
-                pygame.mixer.music.load(str(mp3_path))
-                pygame.mixer.music.play()
-                
-                # Attendre la fin de la lecture
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-                
-                self.is_playing = False
-                return True
-            else:
-                print(f"❌ Fichier MP3 non trouvé: {mp3_path}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Erreur lecture MP3: {e}")
-            self.is_playing = False
+    def expression_mp3_paths(self):
+        """Fichiers MP3 utilisés par les expressions (à précharger)"""
+        paths = {self.mp3_dir / expr["mp3_file"]
+                 for expr in self.config["expressions"].values() if expr.get("mp3_file")}
+        return sorted(path for path in paths if path.exists())
+    
+    def echo_samples(self, sound):
+        """Référence d'écho d'un son, calculée une fois à son décodage (None sans annulation d'écho)"""
+        if not self.config.get("echo_config", {}).get("enabled", True):
+            return None
+        return sound_samples(sound)
+    
+    def on_playback_start(self, path, sound, start, samples=None):
+        """Appelé par le moteur de lecture juste avant chaque son : référence pour l'annulation d'écho"""
+        with self.echo_lock:
+            cancellers = list(self.echo_cancellers)
+        if not cancellers:
+            return
+        if samples is None:
+            # Annulation d'écho activée après le décodage du son
+            try:
+                samples = sound_samples(sound)
+            except Exception as e:
+                print(f"⚠️ Référence d'écho indisponible: {e}")
+                return
+        reference = EchoReference(samples, start)
+        for canceller in cancellers:
+            canceller.add_reference(reference)
+    
+    def create_echo_canceller(self):
+        """Crée un annuleur d'écho à partir de la configuration (None si désactivé)"""
+        echo_config = self.config.get("echo_config", {})
+        if not echo_config.get("enabled", True):
+            return None
+        return EchoCanceller(
+            taps=echo_config.get("taps", 512),
+            step=echo_config.get("step", 0.5),
+            max_delay_ms=echo_config.get("max_delay_ms", 500),
+            calibration_ms=echo_config.get("calibration_ms", 500),
+            suppression=echo_config.get("suppression", 0.5),
+            min_erle_db=echo_config.get("min_erle_db", 6),
+            tail_ms=self.config.get("playback_config", {}).get("mute_tail_ms", 200)
+        )
+    
+    def on_playback_end(self, path, sound, start, end):
+        """Appelé par le moteur de lecture à la fin de chaque son"""
+        self.stage_latency.labels('playback').observe(end - start)
+    
+    def mp3_path(self, mp3_file):
+        """Chemin d'un MP3 du dossier mp3/, ou None s'il n'existe pas"""
+        mp3_path = self.mp3_dir / mp3_file
+        if not mp3_path.exists():
+            print(f"❌ Fichier MP3 non trouvé: {mp3_path}")
+            return None
+        return mp3_path
+    
+    def recording_path(self, audio_file):
+        """Chemin d'un enregistrement, ou None s'il n'existe pas"""
+        audio_path = self.recording_store.path(audio_file)
+        if not audio_path or not audio_path.exists():
+            print(f"❌ Fichier audio non trouvé: {audio_file}")
+            return None
+        self.recording_store.touch(audio_file)
+        return audio_path
+    
+    def play_mp3(self, mp3_file, on_done=None):
+        """Joue un fichier MP3 (sans attendre la fin de la lecture)"""
+        mp3_path = self.mp3_path(mp3_file)
+        if not mp3_path:
             return False
+        self.playback.play([(mp3_path, True)], on_done=on_done)
+        return True
     
-    def replay_audio(self, audio_file):
-        """Rejoue un enregistrement audio"""
-        try:
-            audio_path = self.recordings_dir / audio_file
-            if audio_path.exists():
-                self.is_playing = True
-                
-                # Lecture avec pygame
-                pygame.mixer.music.load(str(audio_path))
-                pygame.mixer.music.play()
-                
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-                
-                self.is_playing = False
-                return True
-            else:
-                print(f"❌ Fichier audio non trouvé: {audio_path}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Erreur replay audio: {e}")
-            self.is_playing = False
+    def replay_audio(self, audio_file, on_done=None):
+        """Rejoue un enregistrement audio (sans attendre la fin de la lecture)"""
+        audio_path = self.recording_path(audio_file)
+        if not audio_path:
             return False
+        # Les enregistrements sont rarement rejoués : inutile de les garder en cache
+        self.playback.play([(audio_path, False)], on_done=on_done)
+        return True
     
-    def is_duplicate_detection(self, expression_key):
+    def is_duplicate_detection(self, expression_key, room):
         """
-        Vérifie si la même expression a été détectée il y a un court instant,
-        pour éviter les doublons dus à l'overlap des segments audio.
+        Vérifie si la même expression a été détectée il y a un court instant
+        dans la même pièce, pour éviter les doublons dus à l'overlap des segments audio.
         """
         current_time = time.time()
         
         # Le cooldown doit être plus long que l'overlap, mais plus court que le segment total.
         # Un bon compromis est 80% de la durée d'enregistrement d'un segment.
-        cooldown_period = self.config["audio_config"]["record_seconds"] * 0.8
+        cooldown_period = room.audio_config["record_seconds"] * 0.8
         
         # On vérifie si une détection pour la MÊME CLÉ a eu lieu dans la période de cooldown
-        for timestamp, key in self.last_detections:
+        for timestamp, key in room.last_detections:
             if key == expression_key and (current_time - timestamp) < cooldown_period:
                 # print(f"🔹 Détection de '{expression_key}' ignorée (cooldown de l'overlap)") # Ligne de debug utile
                 return True
         
         # Ce n'est pas un doublon, on enregistre cette détection pour les prochaines vérifications
-        self.last_detections.append((current_time, expression_key))
+        room.last_detections.append((current_time, expression_key))
         return False
     
-    def detect_expressions(self, text, audio_data):
-        """Détecte les expressions dans le texte de manière insensible à la casse."""
-        if not text or self.is_playing:
-            return
-            
-        # La conversion en minuscules n'est plus nécessaire ici
-        # text_lower = text.lower() 
+    def detect_expressions(self, text, audio_data, words=None, room=None, snapshot=None, new_from=0,
+                           overlapping=False):
+        """Détecte toutes les expressions présentes dans le texte (casse, accents et ponctuation ignorés).
+        
+        `snapshot` : version de la configuration à utiliser (la courante par défaut).
+        `new_from` : position dans le texte normalisé où commence le texte pas
+        encore analysé ; le début ne sert que de contexte (transcription en continu).
+        `overlapping` : le segment chevauche le précédent (fenêtres fixes) ; une
+        expression déjà détectée il y a un instant est alors un doublon.
+        """
+        if not text:
+            return []
         
-        for expr_key, expr_config in self.config["expressions"].items():
-            if not expr_config.get("enabled", True):
+        room = room or self.default_room
+        snapshot = snapshot or self.config_store.current
+        detections = []
+        segment_file = None
+        duration = self.get_audio_duration(audio_data)
+        
+        for expr_key, spans in snapshot.matcher.find(text).items():
+            spans = [span for span in spans if span[1] > new_from]
+            if not spans:
+                continue
+            expr_config = snapshot.expressions.get(expr_key)
+            if not expr_config or not room.listens_to(expr_key):
+                continue
+            if overlapping and self.is_duplicate_detection(expr_key, room):
                 continue
-                
-            # Vérification des patterns
-            total_matches = 0
-            for pattern in expr_config["patterns"]:
-                # On ajoute le drapeau re.IGNORECASE pour rendre la recherche insensible à la casse
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                total_matches += len(matches)
             
-            if total_matches > 0 and not self.is_duplicate_detection(expr_key):
-                # Création de l'info de détection
-                detection_info = {
-                    'id': str(uuid.uuid4()),
-                    'timestamp': datetime.now().isoformat(),
-                    'expression': expr_config["name"],
-                    'expression_key': expr_key,
-                    'text': text,
-                    'matches': total_matches,
-                    'action': expr_config["action"],
-                    'mp3_file': expr_config.get("mp3_file")
-                }
-                
-                # Sauvegarde de l'audio
-                audio_file = self.save_audio_segment(audio_data, detection_info)
-                
-                # Mise à jour des statistiques
-                self.detection_stats[expr_key] += total_matches
-                self.session_detections.append(detection_info)
-                
-                print(f"🎯 Détection: '{expr_config['name']}' dans '{text}' (Action: {expr_config['action']})")
-                
-                # Exécution des actions
-                threading.Thread(
-                    target=self.execute_action,
-                    args=(detection_info,),
-                    daemon=True
-                ).start()
-                
-                return
+            total_matches = len(spans)
+            
+            # Création de l'info de détection
+            detection_info = {
+                'id': str(uuid.uuid4()),
+                'timestamp': datetime.now().isoformat(),
+                'expression': expr_config["name"],
+                'expression_key': expr_key,
+                'text': text,
+                'matches': total_matches,
+                'action': expr_config["action"],
+                'mp3_file': expr_config.get("mp3_file"),
+                'source': room.id,
+                'source_name': room.name
+            }
+            
+            # Sauvegarde de l'audio : uniquement le passage de l'expression quand on sait le situer,
+            # sinon le segment entier (un seul fichier pour toutes les détections du segment)
+            if self.live:
+                clip = self.locate_expression(expr_key, text, spans[0], words, duration, snapshot)
+                if clip:
+                    self.save_audio_segment(audio_data, detection_info, clip)
+                elif segment_file is None:
+                    segment_file = self.save_audio_segment(audio_data, detection_info)
+                else:
+                    detection_info['audio_file'] = segment_file
+            
+            # Mise à jour des statistiques
+            # (une expression ajoutée depuis l'interface n'a pas encore de compteur)
+            with self.stats_lock:
+                self.detection_stats[expr_key] = self.detection_stats.get(expr_key, 0) + total_matches
+            room.count_detection(expr_key, total_matches)
+            self.detection_log.add(detection_info)
+            self.detections_total.labels(expr_key, room.id).inc(total_matches)
+            self.events.publish('detection', {
+                'detection': detection_info,
+                'detection_stats': self.detection_stats_snapshot()
+            }, event_id=detection_info['seq'])
+            detections.append(detection_info)
+            
+            print(f"🎯 Détection ({room.name}): '{expr_config['name']}' dans '{text}' (Action: {expr_config['action']})")
+        
+        if detections and self.live:
+            # Les actions partent dans la file de lecture, l'une après l'autre
+            self.execute_actions(detections)
+        
+        return detections
+    
+    def execute_actions(self, detections):
+        """Exécute les actions de plusieurs détections à la suite"""
+        for detection_info in detections:
+            self.execute_action(detection_info)
     
     def execute_action(self, detection_info):
         """Exécute l'action définie pour la détection"""
         action = detection_info["action"]
         
         try:
-            if action == "mp3" and detection_info["mp3_file"]:
-                self.play_mp3(detection_info["mp3_file"])
-                
-            elif action == "replay" and detection_info.get("audio_file"):
-                self.replay_audio(detection_info["audio_file"])
-                
-            elif action == "both":
-                # MP3 puis replay
-                if detection_info["mp3_file"]:
-                    self.play_mp3(detection_info["mp3_file"])
-                    time.sleep(0.5)  # Pause entre les deux
-                if detection_info.get("audio_file"):
-                    self.replay_audio(detection_info["audio_file"])
+            sounds = []
+            if action in ("mp3", "both") and detection_info["mp3_file"]:
+                sounds.append((self.mp3_path(detection_info["mp3_file"]), True))
+            if action in ("replay", "both") and detection_info.get("audio_file"):
+                sounds.append((self.recording_path(detection_info["audio_file"]), False))
+            
+            # MP3 puis replay, avec une pause entre les deux
+            sounds = [(path, cache) for path, cache in sounds if path]
+            if sounds:
+                self.playback.play(sounds, pause=0.5)
                     
         except Exception as e:
             print(f"❌ Erreur exécution action: {e}")
     
-    def transcribe_audio(self, audio_data):
-        """Transcrit l'audio en français"""
+    def pcm_to_float32(self, audio_data):
+        """Convertit le PCM int16 (déjà mono à 16 kHz depuis la capture) en tableau float32 pour Whisper"""
+        return np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    def transcribe_audio(self, audio_data, timings=None, words=None, prompt=None):
+        """Transcrit l'audio en français
+        
+        Le PCM est passé directement en mémoire à Whisper ; le fichier WAV
+        temporaire n'est utilisé qu'en secours. Si `timings` est un dict, il
+        est rempli avec le détail des latences (en ms) et le mode utilisé.
+        Si `words` est une liste, elle reçoit les horodatages des mots.
+        `prompt` : texte précédent, donné comme contexte au décodeur.
+        """
+        if timings is None:
+            timings = {}
+        
+        active = None
+        try:
+            start = time.perf_counter()
+            audio_input = self.pcm_to_float32(audio_data)
+            timings['conversion_ms'] = (time.perf_counter() - start) * 1000
+            
+            # Le modèle actif est lu une fois : une bascule en cours n'affecte pas ce segment
+            active = self.models.active
+            start = time.perf_counter()
+            text = active.transcriber.transcribe(audio_input, words=words, prompt=prompt)
+            timings['whisper_ms'] = (time.perf_counter() - start) * 1000
+            timings['mode'] = 'memory'
+            return text
+            
+        except Exception as e:
+            # Secours sur le modèle qui a échoué, pas sur celui qui l'aurait remplacé entre-temps
+            backend = active.backend if active else None
+            if backend is None or backend.model is None:
+                # Aucun modèle, ou modèle chargé dans des processus d'inférence : pas de secours ici
+                print(f"❌ Erreur transcription: {e}")
+                return ""
+            print(f"⚠️ Transcription en mémoire impossible ({e}), passage par un fichier WAV")
+            if words:
+                words.clear()
+            return self.transcribe_audio_file(audio_data, timings, words, prompt, backend)
+    
+    def transcribe_audio_file(self, audio_data, timings=None, words=None, prompt=None, backend=None):
+        """Transcrit l'audio en passant par un fichier WAV temporaire (secours)"""
+        backend = backend or self.model
+        if timings is None:
+            timings = {}
+        
         try:
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+                start = time.perf_counter()
                 wf = wave.open(temp_file.name, 'wb')
-                wf.setnchannels(self.config["audio_config"]["channels"])
-                wf.setsampwidth(self.audio.get_sample_size(getattr(pyaudio, self.config["audio_config"]["format"])))
-                wf.setframerate(self.config["audio_config"]["rate"])
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(PIPELINE_RATE)
                 wf.writeframes(audio_data)
                 wf.close()
+                timings['conversion_ms'] = (time.perf_counter() - start) * 1000
                 
-                result = self.model.transcribe(
-                    temp_file.name,
-                    language="french",
-                    fp16=False,
-                    verbose=False,
-                    condition_on_previous_text=False,
-                    temperature=0.0
-                )
-                text = result["text"].strip()
+                start = time.perf_counter()
+                text = backend.transcribe(temp_file.name, words=words, prompt=prompt)
+                timings['whisper_ms'] = (time.perf_counter() - start) * 1000
+                timings['mode'] = 'file'
                 
                 os.unlink(temp_file.name)
                 return text
@@ -367,112 +723,379 @@ class TicDetectorApp:
             print(f"❌ Erreur transcription: {e}")
             return ""
     
-    def audio_callback(self):
-        """Thread d'enregistrement audio"""
+    def audio_callback(self, room):
+        """Thread d'enregistrement audio d'une pièce"""
+        source = MicrophoneSource(self.audio, room.audio_config,
+                                  on_overflow=self.audio_overflows_total.inc)
+        streamer = None
         try:
-            stream = self.audio.open(
-                format=getattr(pyaudio, self.config["audio_config"]["format"]),
-                channels=self.config["audio_config"]["channels"],
-                rate=self.config["audio_config"]["rate"],
-                input=True,
-                frames_per_buffer=self.config["audio_config"]["chunk"]
-            )
-            
-            print("🎤 Écoute en cours avec VAD...")
+            source.open()
             
-            frames = []
-            frame_count = 0
-            frames_per_segment = int(self.config["audio_config"]["rate"] / self.config["audio_config"]["chunk"] * self.config["audio_config"]["record_seconds"])
+            print(f"🎤 Écoute en cours avec VAD ({room.name})...")
             
-            while self.is_recording:
+            streamer = self.create_streamer(room)
+            for audio_data, stats in self.segment_stream(source, streamer):
+                if streamer:
+                    # Déjà transcrit au fil de l'eau : il ne reste que la fin de l'énoncé
+                    streamer.finish(audio_data, stats)
+                else:
+                    self.segment_queue.put(audio_data, stats, room, source=room.id)
+                    
+        except Exception as e:
+            print(f"❌ Erreur stream audio ({room.name}): {e}")
+        finally:
+            if streamer:
+                streamer.close()
+            source.close()
+    
+    def create_streamer(self, room):
+        """Transcription en continu d'une pièce (None si désactivée : énoncés complets)"""
+        streaming_config = self.config.get("streaming_config", {})
+        if not streaming_config.get("enabled", False):
+            return None
+        if not self.vad_enabled:
+            print("⚠️ Transcription en continu impossible sans VAD : énoncés complets")
+            return None
+        return StreamingDecoder(
+            transcribe=lambda audio_data, prompt, stats: self.transcribe_partial(room, audio_data, prompt, stats),
+            on_confirmed=lambda committed, new_count, audio_data, final, transcribed: self.process_confirmed_words(
+                room, committed, new_count, audio_data, final, transcribed),
+            step_ms=streaming_config.get("step_ms", 500),
+            agreement=streaming_config.get("agreement", 2),
+            context_chars=streaming_config.get("context_chars", 200),
+            name=f"stream-{room.id}"
+        )
+    
+    def transcribe_partial(self, room, audio_data, prompt=None, stats=None):
+        """Transcrit l'énoncé en cours (depuis son début) et retourne ses mots
+        
+        `stats` n'est fourni que pour l'énoncé terminé. Sans horodatages (mode
+        `segment` ou inférence par lots), les mots sont tirés du texte.
+        Retourne None si l'énoncé est trop faible pour être transcrit.
+        """
+        final = stats is not None
+        if stats is None:
+            stats = self.segment_levels(audio_data)
+        if not self.passes_gate(stats):
+            if final:
+                self.count_segment(room, 'gated')
+            return None
+        
+        timings = {}
+        clip_mode = self.config.get("recording_config", {}).get("clip_mode", "estimate")
+        words = [] if clip_mode == "words" else None
+        text = self.transcribe_audio(audio_data, timings, words, prompt)
+        self.stage_latency.labels('whisper').observe(timings.get('whisper_ms', 0) / 1000)
+        if not words:
+            words = [{'word': word} for word in (text or "").split()]
+        return words
+    
+    def process_confirmed_words(self, room, committed, new_count, audio_data, final, transcribed=True):
+        """Cherche les expressions dans les mots nouvellement confirmés de l'énoncé en cours
+        
+        Les quelques mots confirmés juste avant servent de contexte, pour
+        qu'une expression à cheval sur deux confirmations soit trouvée ; seules
+        les correspondances qui touchent les nouveaux mots comptent.
+        """
+        snapshot = self.config_store.current
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        prefix = f"[{timestamp}] [{room.name}]" if len(self.rooms) > 1 else f"[{timestamp}]"
+        
+        new_words = committed[len(committed) - new_count:]
+        if final and transcribed:
+            self.count_segment(room, 'transcribed')
+            text = " ".join(w['word'].strip() for w in committed)
+            print(f"{prefix} 📝 {text}" if text else f"{prefix} 🔇 [Aucun texte détecté]")
+        elif new_words:
+            print(f"{prefix} ⏩ {' '.join(w['word'].strip() for w in new_words)}")
+        if not new_words:
+            return []
+        
+        context_words = self.config.get("streaming_config", {}).get("context_words", 3)
+        context = committed[max(0, len(committed) - new_count - context_words):len(committed) - new_count]
+        context_text = normalize_text(" ".join(w['word'] for w in context))
+        words = context + new_words
+        text = " ".join(w['word'].strip() for w in words)
+        timed = all('start' in w for w in words)
+        
+        start = time.perf_counter()
+        detections = self.detect_expressions(text, audio_data, words if timed else None, room, snapshot,
+                                             new_from=len(context_text) + 1 if context_text else 0)
+        self.stage_latency.labels('detect').observe(time.perf_counter() - start)
+        return detections
+    
+    def segment_stream(self, source, streamer=None):
+        """Découpe l'audio d'une source en segments à transcrire
+        
+        Produit des tuples (audio_data, stats) en PCM int16 mono à PIPELINE_RATE :
+        l'audio est converti une seule fois, à la lecture. `stats` contient les
+        mesures déjà faites par le VAD sur l'énoncé (None pour une fenêtre fixe).
+        Une source temps réel (micro) est lue tant que l'écoute est active ;
+        une source fichier est lue jusqu'au bout, aussi vite que possible.
+        Pendant la lecture d'un son, l'écho est retiré du micro (ou, sans
+        annulation d'écho, le micro est coupé).
+        Avec un `streamer` (transcription en continu), l'énoncé en cours lui
+        est aussi signalé au fil de l'eau.
+        """
+        audio_config = source.audio_config
+        converter = CaptureConverter(audio_config["rate"], audio_config["channels"])
+        chunk_seconds = audio_config["chunk"] / audio_config["rate"]
+        mute_tail = self.config.get("playback_config", {}).get("mute_tail_ms", 200) / 1000
+        echo = self.create_echo_canceller() if source.realtime else None
+        if echo:
+            with self.echo_lock:
+                self.echo_cancellers.add(echo)
+        
+        # Découpage en énoncés par VAD, ou fenêtres fixes si VAD désactivé
+        vad_generation = self.vad_generation
+        segmenter = self.create_segmenter() if self.vad_enabled else None
+        
+        # Fenêtre fixe préallouée (sans VAD), avec 25 % de chevauchement
+        samples_per_segment = int(PIPELINE_RATE * audio_config["record_seconds"])
+        window = np.zeros(samples_per_segment, dtype=np.int16)
+        overlap = samples_per_segment // 4
+        filled = 0
+        
+        try:
+            while self.is_recording or not source.realtime:
                 try:
-                    # Si un son est en cours de lecture (MP3 ou replay)
-                    if self.is_playing:
-                        # On vide le buffer pour ne pas analyser ce qui a été joué
-                        frames = []
-                        frame_count = 0
-                        # On attend un court instant pour ne pas surcharger le CPU
-                        time.sleep(0.1)
-                        # On passe à la prochaine itération de la boucle
+                    start = time.perf_counter()
+                    data = source.read()
+                    # Heure de capture du bloc si la source la connaît (micro en mode callback)
+                    read_at = getattr(source, 'captured_at', None) or time.time()
+                    if source.realtime:
+                        self.observe_stage('read', start)
+                        self.audio_reads_total.inc()
+                
+                    # Fin d'une source fichier : on rend ce qui reste
+                    if data is None:
+                        if segmenter:
+                            utterance = segmenter.flush()
+                            if utterance:
+                                yield utterance
+                        elif filled:
+                            yield window[:filled].tobytes(), None
+                        return
+                
+                    data = converter.process(data)
+                
+                    # Son joué par enVrai (MP3 ou replay) : on retire son écho du micro,
+                    # sinon on vide le buffer pour ne pas analyser ce qui a été joué
+                    if echo:
+                        start = time.perf_counter()
+                        data = echo.process(data, read_at)
+                        self.observe_stage('echo', start)
+                    elif source.realtime and self.playback.overlaps(read_at - chunk_seconds, read_at, mute_tail):
+                        data = None
+                    if data is None:
+                        filled = 0
+                        if segmenter:
+                            segmenter.reset()
+                        if streamer:
+                            streamer.cancel()
                         continue
-
-                    data = stream.read(self.config["audio_config"]["chunk"], exception_on_overflow=False)
-                    frames.append(data)
-                    frame_count += 1
+                
+                    # La config VAD a changé via l'interface web
+                    if vad_generation != self.vad_generation:
+                        vad_generation = self.vad_generation
+                        segmenter = self.create_segmenter() if self.vad_enabled else None
+                        if streamer:
+                            streamer.cancel()
+                
+                    if segmenter:
+                        # Seuls les énoncés complets partent en transcription
+                        start = time.perf_counter()
+                        utterances = segmenter.feed(data)
+                        self.observe_stage('vad', start)
+                        for utterance in utterances:
+                            yield utterance
+                        if streamer:
+                            streamer.follow(segmenter)
+                        continue
+                
+                    samples = np.frombuffer(data, dtype=np.int16)
+                    while len(samples):
+                        count = min(len(samples), samples_per_segment - filled)
+                        window[filled:filled + count] = samples[:count]
+                        filled += count
+                        samples = samples[count:]
                     
-                    if frame_count >= frames_per_segment:
-                        audio_data = b''.join(frames)
-                        
-                        threading.Thread(
-                            target=self.process_audio_segment,
-                            args=(audio_data,),
-                            daemon=True
-                        ).start()
-                        
-                        # Overlap de 25%
-                        overlap_frames = frames_per_segment // 4
-                        frames = frames[-overlap_frames:] if len(frames) > overlap_frames else []
-                        frame_count = len(frames)
+                        if filled == samples_per_segment:
+                            yield window.tobytes(), None
                         
+                            # Overlap de 25%
+                            window[:overlap] = window[samples_per_segment - overlap:]
+                            filled = overlap
+                    
                 except Exception as e:
+                    if not source.realtime:
+                        raise
                     print(f"⚠️ Erreur lecture audio: {e}")
                     time.sleep(0.1)
-                    
-        except Exception as e:
-            print(f"❌ Erreur stream audio: {e}")
         finally:
-            try:
-                stream.stop_stream()
-                stream.close()
-            except:
-                pass
+            with self.echo_lock:
+                self.echo_cancellers.discard(echo)
     
-    def process_audio_segment(self, audio_data):
-        """Traite un segment audio, le transcrit et affiche le résultat horodaté."""
+    def process_audio_segment(self, audio_data, stats=None, room=None):
+        """Traite un segment audio, le transcrit et affiche le résultat horodaté.
+        
+        `stats` (crête, énergie, taux de voix) est fourni quand le segment est un
+        énoncé déjà délimité par le VAD : il n'est alors pas réanalysé.
+        `room` est la pièce d'où vient le segment (pièce par défaut sinon).
+        Retourne le détail des latences par étape (ms) et les détections.
+        """
+        room = room or self.default_room
+        # Une seule version de la configuration pour tout le segment
+        snapshot = self.config_store.current
+        timings = {}
         try:
-            if self.is_playing:
-                return
+            segment_start = time.perf_counter()
                 
             # 1. Vérification du niveau audio pour ignorer le bruit de fond
-            audio_np = np.frombuffer(audio_data, dtype=np.int16)
-            if np.max(np.abs(audio_np)) < 1000:
-                return
+            if stats is None:
+                stats = self.segment_levels(audio_data)
+            timings['gate_ms'] = (time.perf_counter() - segment_start) * 1000
+            if not self.passes_gate(stats):
+                self.count_segment(room, 'gated')
+                return timings
             
-            # 2. Vérification de l'activité vocale (VAD)
-            # Si pas de voix, on ne fait rien et on n'affiche rien.
-            if not self.has_voice_activity(audio_data):
-                return
+            # 2. L'activité vocale est déjà vérifiée par le découpeur VAD ; sans
+            # mesure du VAD, le segment est une fenêtre fixe (qui chevauche la précédente)
+            fixed_window = 'voice_ratio' not in stats
+            
+            # 3. Filtre par mots-clés : seuls les segments prometteurs passent au modèle principal
+            spotter = self.spotter
+            if spotter:
+                start = time.perf_counter()
+                try:
+                    verdict = spotter.check(self.pcm_to_float32(audio_data), snapshot, room.listens_to)
+                except Exception as e:
+                    # Dans le doute, le segment est transcrit
+                    print(f"⚠️ Erreur filtre par mots-clés: {e}")
+                    verdict = None
+                timings['spot_ms'] = (time.perf_counter() - start) * 1000
+                if verdict:
+                    timings['spotter'] = verdict
+                    self.spotter_total.labels(verdict).inc()
+                if verdict == SKIPPED:
+                    self.count_segment(room, 'spotted_out')
+                    return timings
             
-            # 3. Transcription (uniquement si voix détectée)
-            text = self.transcribe_audio(audio_data)
+            # 4. Transcription (uniquement si voix détectée)
+            clip_mode = snapshot.data.get("recording_config", {}).get("clip_mode", "estimate")
+            words = [] if clip_mode == "words" else None
+            text = self.transcribe_audio(audio_data, timings, words)
+            self.count_segment(room, 'transcribed')
+            timings['total_ms'] = (time.perf_counter() - segment_start) * 1000
             
-            # 4. Affichage horodaté systématique du résultat de Whisper
+            # 5. Affichage horodaté systématique du résultat de Whisper
             timestamp = datetime.now().strftime("%H:%M:%S")
+            # Avec plusieurs pièces, on précise d'où vient le texte
+            prefix = f"[{timestamp}] [{room.name}]" if len(self.rooms) > 1 else f"[{timestamp}]"
+            latency = self.format_timings(timings)
             if text and text.strip():
                 # Affiche le texte si Whisper a produit un résultat
-                print(f"[{timestamp}] 📝 {text}")
+                print(f"{prefix} 📝 {text} {latency}")
             else:
                 # Affiche un message si Whisper n'a rien retourné
-                print(f"[{timestamp}] 🔇 [Aucun texte détecté]")
+                print(f"{prefix} 🔇 [Aucun texte détecté] {latency}")
             
-            # 5. Détection des expressions (uniquement si le texte est pertinent)
-            if text and len(text.strip()) > 2 and not self.is_playing:
-                self.detect_expressions(text, audio_data)
+            # 6. Détection des expressions (uniquement si le texte est pertinent)
+            if text and len(text.strip()) > 2:
+                start = time.perf_counter()
+                timings['detections'] = self.detect_expressions(text, audio_data, words, room, snapshot,
+                                                                overlapping=fixed_window)
+                timings['detect_ms'] = (time.perf_counter() - start) * 1000
+            
+            # Ce que la transcription complète a trouvé sert à estimer le rappel du filtre
+            if spotter and 'spotter' in timings:
+                spotter.record(timings['spotter'], bool(timings.get('detections')))
                     
         except Exception as e:
             print(f"⚠️ Erreur traitement: {e}")
+        
+        for stage in ('gate', 'spot', 'conversion', 'whisper', 'detect'):
+            if f'{stage}_ms' in timings:
+                self.stage_latency.labels(stage).observe(timings[f'{stage}_ms'] / 1000)
+        return timings
+    
+    def detection_stats_snapshot(self):
+        """Copie des compteurs de détection, cohérente même pendant une détection"""
+        with self.stats_lock:
+            return dict(self.detection_stats)
+    
+    def count_segment(self, room, outcome):
+        """Compte l'issue d'un segment, globalement et pour sa pièce"""
+        self.segments_total.labels(outcome, room.id).inc()
+        room.count_segment(outcome)
+    
+    def segment_levels(self, audio_data):
+        """Crête et énergie d'un segment non découpé par le VAD (calcul vectorisé)"""
+        audio_np = np.frombuffer(audio_data, dtype=np.int16)
+        if not len(audio_np):
+            return {'peak': 0, 'rms': 0.0}
+        peaks, rms = frame_levels(audio_np[None, :])
+        return {'peak': int(peaks[0]), 'rms': float(rms[0])}
+    
+    def passes_gate(self, stats):
+        """Le segment est-il assez fort pour valoir une transcription ?"""
+        gate_config = self.config.get("gate_config", {})
+        return (stats['peak'] >= gate_config.get("peak_threshold", 1000)
+                and stats['rms'] >= gate_config.get("rms_threshold", 0))
+    
+    def format_timings(self, timings):
+        """Formate le détail des latences d'un segment pour l'affichage console"""
+        return (f"(⏱️ conversion {timings.get('conversion_ms', 0):.1f} ms"
+                f" · whisper {timings.get('whisper_ms', 0):.0f} ms"
+                f" · total {timings.get('total_ms', 0):.0f} ms"
+                f" · {timings.get('mode', '?')})")
     
     def start_listening(self):
-        """Démarre l'écoute"""
+        """Démarre l'écoute
+        
+        La capture commence dès que le micro est prêt ; tant que le modèle
+        se charge, les segments attendent dans la file (dans sa limite).
+        """
         self.is_recording = True
+        self.events.publish('status', {'is_recording': True})
+        
+        self.startup.wait('audio')
+        if not self.startup.succeeded('audio'):
+            self.is_recording = False
+            self.events.publish('status', {'is_recording': False})
+            return
+        
+        # Un thread de capture par pièce, tous alimentant la même file
+        capture_threads = []
+        for room in self.rooms.values():
+            audio_thread = threading.Thread(target=self.audio_callback, args=(room,),
+                                            name=f"capture-{room.id}", daemon=True)
+            audio_thread.start()
+            capture_threads.append(audio_thread)
         
-        audio_thread = threading.Thread(target=self.audio_callback, daemon=True)
-        audio_thread.start()
+        if not self.startup.wait('warmup', 0):
+            print("⏳ Modèle en cours de chargement, les segments sont mis en attente...")
+        while self.is_recording and not self.startup.wait('warmup', 0.5):
+            pass
+        if not self.is_recording:
+            return
+        if not self.startup.succeeded('warmup'):
+            # On ne défait que cette écoute : le micro et le son restent prêts pour une relance
+            print("❌ Modèle indisponible, écoute annulée")
+            self.is_recording = False
+            self.segment_queue.stop()
+            for audio_thread in capture_threads:
+                audio_thread.join(timeout=2)
+            self.events.publish('status', {'is_recording': False})
+            return
+        self.segment_queue.start()
         
         print("\n" + "="*80)
         print("🎤 EnVrai : détecteur de tics de langage français (Version MP3 + VAD)")
-        print(f"🤖 Modèle Whisper: {self.config['whisper_model']}")
+        print(f"🤖 Modèle Whisper: {self.model.describe()}")
         print(f"🎙️ VAD: {'Activé' if self.vad_enabled else 'Désactivé'}")
+        print(f"🏠 Pièces: {', '.join(room.name for room in self.rooms.values())}")
+        print(f"🧵 Workers: {self.segment_queue.num_workers} (file: {self.segment_queue.max_size}, {self.segment_queue.drop_policy})")
         print(f"📂 Enregistrements: {self.recordings_dir}")
         print(f"🎵 MP3: {self.mp3_dir}")
         print("="*80)
@@ -484,38 +1107,86 @@ class TicDetectorApp:
         except KeyboardInterrupt:
             self.stop_listening()
     
-    def stop_listening(self):
-        """Arrête l'écoute"""
+    def start_in_background(self):
+        """Démarre l'écoute dans un thread ; retourne False si elle était déjà active"""
+        if self.is_recording:
+            return False
+        # Marqué tout de suite : un arrêt demandé juste après ne peut pas passer avant
+        self.is_recording = True
+        threading.Thread(target=self.start_listening, name="listening", daemon=True).start()
+        return True
+    
+    def stop_listening(self, shutdown=True):
+        """Arrête l'écoute
+        
+        Sans `shutdown` (arrêt depuis l'interface web), le micro et le son
+        restent initialisés pour pouvoir relancer l'écoute.
+        """
         print("\n🛑 Arrêt en cours...")
         self.is_recording = False
+        self.segment_queue.stop()
+        self.events.publish('status', {'is_recording': False})
         time.sleep(1)
         
         # Affichage des statistiques
         print(f"\n📊 Statistiques de la session:")
-        total_detections = sum(self.detection_stats.values())
+        detection_stats = self.detection_stats_snapshot()
+        total_detections = sum(detection_stats.values())
         
         if total_detections > 0:
-            for expr_key, count in self.detection_stats.items():
+            for expr_key, count in detection_stats.items():
                 if count > 0:
-                    expr_name = self.config["expressions"][expr_key]["name"]
+                    # L'expression a pu être supprimée depuis
+                    expr_name = self.config["expressions"].get(expr_key, {}).get("name", expr_key)
                     percentage = (count / total_detections * 100)
                     print(f"   • {expr_name}: {count} fois ({percentage:.1f}%)")
         else:
             print("   Aucune détection")
         
+        self.save_config()
+        if not shutdown:
+            print("\n⏸️ Écoute arrêtée")
+            return
+        
         if self.audio:
             self.audio.terminate()
-        pygame.mixer.quit()
+        self.playback.stop()
+        if self.live:
+            import pygame
+            pygame.mixer.quit()
         print("\n👋 Session terminée!")
     
-    def get_stats(self):
-        """Retourne les statistiques pour l'API web"""
-        return {
-            'detection_stats': self.detection_stats,
-            'session_detections': self.session_detections,
+    def get_health(self):
+        """État du démarrage et segments en attente du modèle, pour /api/health"""
+        health = self.startup.snapshot()
+        health['is_recording'] = self.is_recording
+        health['buffered_segments'] = self.segment_queue.get_stats()['depth']
+        health['models'] = self.models.get_stats()
+        return health
+    
+    def get_stats(self, since=None):
+        """Retourne les statistiques pour l'API web
+        
+        Avec `since` (numéro de séquence), seules les détections plus récentes
+        sont renvoyées, sans la configuration.
+        """
+        stats = {
+            'detection_stats': self.detection_stats_snapshot(),
             'is_recording': self.is_recording,
-            'config': self.config
+            'queue': self.segment_queue.get_stats(),
+            'models': self.models.get_stats(),
+            'spotter': self.spotter.get_stats() if self.spotter else None,
+            'sources': {room_id: room.get_stats() for room_id, room in self.rooms.items()},
+            'recordings': self.recording_store.get_stats(),
+            'cursor': self.detection_log.last_seq
         }
+        
+        if since is None:
+            stats['session_detections'] = self.detection_log.recent()
+            stats['config'] = self.config
+        else:
+            stats['detections'] = self.detection_log.since(since)
+        return stats
 
 def main():
     parser = argparse.ArgumentParser(description='Détecteur de tics avec MP3 et interface web')
@@ -525,20 +1196,19 @@ def main():
     args = parser.parse_args()
     
     if args.web:
-        from web_interface import create_app
-        import threading
+        from web_interface import create_app, serve
         import logging
 
-        app_instance = TicDetectorApp(args.config)
+        # L'interface répond tout de suite ; micro et modèle se chargent en arrière-plan
+        app_instance = TicDetectorApp(args.config, background=True)
 
         log = logging.getLogger('werkzeug')
         log.setLevel(logging.ERROR)
         
-        threading.Thread(target=app_instance.start_listening, daemon=True).start()
+        app_instance.start_in_background()
         
         web_app = create_app(app_instance)
-        print("🌐 Interface web disponible sur http://localhost:5010")
-        web_app.run(host='0.0.0.0', port=5010, debug=True)
+        serve(web_app, app_instance.config.get("web_config", {}))
     else:
         print("🚀 Détecteur de tics de langage français (Version MP3)")
         app = TicDetectorApp(args.config)
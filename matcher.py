@@ -0,0 +1,281 @@
+import re
+import unicodedata
+
+# Tout ce qui n'est ni lettre ni chiffre (ponctuation, apostrophes, espaces...)
+SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_text(text):
+    """Normalise un texte pour la recherche : minuscules, sans accents, ponctuation et espaces réduits"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return SEPARATORS.sub(" ", text).strip()
+
+
+# Règles phonétiques simplifiées pour le français, appliquées mot par mot
+PHONETIC_RULES = [(re.compile(pattern), repl) for pattern, repl in [
+    (r"(?<=.)e$", ""),
+    (r"(?<=.)(er|ez|et)$", "e"),
+    (r"(?<=..)[stdxz]$", ""),
+    (r"ph", "f"),
+    (r"sch|sh|ch", "X"),
+    (r"qu|q|ck", "k"),
+    (r"c(?=[eiy])", "s"),
+    (r"c", "k"),
+    (r"gu(?=[eiy])", "g"),
+    (r"g(?=[eiy])", "j"),
+    (r"gn", "N"),
+    (r"tion", "sion"),
+    (r"mpt", "nt"),
+    (r"h", ""),
+    (r"eau|au", "o"),
+    (r"ou", "U"),
+    (r"ai|ei", "e"),
+    (r"(ain|ein|in|im|yn|un|um)(?![aeiouy])", "I"),
+    (r"(an|am|en|em)(?![aeiouy])", "A"),
+    (r"(on|om)(?![aeiouy])", "O"),
+    (r"y", "i"),
+    (r"z", "s"),
+    (r"w", "v"),
+    (r"x", "ks"),
+    (r"(.)\1+", r"\1"),
+]]
+
+
+def phonetic_word(word):
+    """Clé phonétique (approximative) d'un mot déjà normalisé"""
+    for regex, repl in PHONETIC_RULES:
+        word = regex.sub(repl, word)
+    return word
+
+
+def phonetic_key(words):
+    """Clé phonétique d'une suite de mots : les espaces ne comptent pas ("quand tine" ~ "cantine")"""
+    key = "".join(phonetic_word(w) for w in words)
+    return re.sub(r"(.)\1+", r"\1", key)
+
+
+def edit_distance(a, b, max_distance):
+    """Distance de Levenshtein bornée (retourne max_distance + 1 au-delà)"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def deletions(key, distance):
+    """Toutes les variantes de `key` obtenues en supprimant jusqu'à `distance` caractères"""
+    variants = {key}
+    frontier = {key}
+    for _ in range(distance):
+        frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """Index phonétique + distance d'édition bornée (méthode par suppressions, type SymSpell).
+
+    Chaque clé phonétique de pattern est indexée avec ses variantes par
+    suppression : une recherche ne fait que des accès dictionnaire, sans
+    parcourir la liste des patterns.
+    """
+
+    def __init__(self, lenient=False):
+        self.keys = {}
+        self.variants = {}
+        self.max_distance = 0
+        self.ngram_sizes = set()
+        self.lenient = lenient
+
+    def allowed_distance(self, key, distance):
+        """Plus la clé est courte, moins on tolère d'erreurs (mode `lenient` : au moins une)
+
+        Sans `lenient`, une clé de moins de 6 sons n'en tolère aucune : à une
+        erreur près, "kAtoX" (cantoche) serait à deux pas de mots courants.
+        """
+        if self.lenient:
+            return min(distance, max(1, (len(key) - 1) // 2))
+        return min(distance, max(0, (len(key) - 4) // 2))
+
+    def add(self, expr_key, pattern, distance):
+        """Indexe un pattern (déjà normalisé) d'une expression"""
+        words = pattern.split()
+        key = phonetic_key(words)
+        if not key:
+            return
+
+        distance = self.allowed_distance(key, distance)
+        owners = self.keys.setdefault(key, {})
+        owners[expr_key] = max(owners.get(expr_key, 0), distance)
+        for variant in deletions(key, distance):
+            self.variants.setdefault(variant, set()).add(key)
+
+        self.max_distance = max(self.max_distance, distance)
+        # Whisper peut couper ou coller les mots : on teste n-1, n et n+1 mots
+        self.ngram_sizes.update(range(max(1, len(words) - 1), len(words) + 2))
+
+    def search(self, normalized_text):
+        """Retourne {clé d'expression: [(premier mot, dernier mot + 1), ...]} des correspondances approximatives"""
+        words = normalized_text.split()
+        word_keys = [phonetic_word(w) for w in words]
+        spans = {}
+
+        for n in sorted(self.ngram_sizes):
+            for start in range(len(words) - n + 1):
+                query = re.sub(r"(.)\1+", r"\1", "".join(word_keys[start:start + n]))
+                candidates = set()
+                for variant in deletions(query, self.max_distance):
+                    candidates |= self.variants.get(variant, set())
+
+                for key in candidates:
+                    for expr_key, distance in self.keys[key].items():
+                        if edit_distance(query, key, distance) <= distance:
+                            spans.setdefault(expr_key, []).append((start, start + n))
+
+        # Une occurrence par groupe de n-grammes qui se chevauchent
+        merged = {}
+        for expr_key, expr_spans in spans.items():
+            merged[expr_key] = []
+            for start, stop in sorted(expr_spans):
+                if merged[expr_key] and start < merged[expr_key][-1][1]:
+                    last_start, last_stop = merged[expr_key][-1]
+                    merged[expr_key][-1] = (last_start, max(last_stop, stop))
+                else:
+                    merged[expr_key].append((start, stop))
+        return merged
+
+
+class ExpressionMatcher:
+    """Recherche toutes les expressions activées en une seule passe.
+
+    Les patterns de toutes les expressions sont normalisés puis compilés dans
+    une unique expression régulière (alternance, du plus long au plus court).
+    Un pattern doit couvrir des mots entiers ("où" ne se trouve pas dans
+    "ouvert"), sauf pour les expressions avec `"prefix": true`, dont les
+    patterns sont des débuts de mots ("belliqueu" pour "belliqueux").
+    `update()` ne renormalise que les expressions modifiées et ne recompile
+    l'alternance que si l'ensemble des patterns a changé.
+
+    Les expressions avec `"fuzzy": true` sont aussi cherchées de façon
+    approximative (clé phonétique + `fuzzy_distance` erreurs tolérées), à
+    partir de leur premier pattern seulement : les autres sont déjà des
+    variantes écrites à la main, les élargir encore attraperait des mots
+    courants.
+    `lenient` tolère des erreurs même sur les expressions courtes (pour un
+    premier filtre, où rater une expression coûte plus qu'une fausse alerte).
+    """
+
+    def __init__(self, expressions=None, lenient=False):
+        self.lenient = lenient
+        self.entries = {}
+        self.pattern_owners = {}
+        self.alternatives = frozenset()
+        self.regex = None
+        self.fuzzy_index = None
+        if expressions:
+            self.update(expressions)
+
+    def update(self, expressions):
+        """Synchronise le matcher avec le dict `expressions` de la configuration"""
+        entries = {}
+        for expr_key, expr_config in expressions.items():
+            signature = (tuple(expr_config.get("patterns", [])), expr_config.get("enabled", True),
+                         expr_config.get("fuzzy", False), expr_config.get("fuzzy_distance", 1),
+                         expr_config.get("prefix", False))
+            cached = self.entries.get(expr_key)
+            if cached and cached[0] == signature:
+                entries[expr_key] = cached
+                continue
+
+            patterns = set()
+            if signature[1]:
+                patterns = {normalize_text(p) for p in signature[0]}
+                patterns.discard("")
+            entries[expr_key] = (signature, frozenset(patterns))
+
+        if entries == self.entries:
+            return
+
+        # Propriétaires de chaque pattern : (clé d'expression, début de mot suffisant)
+        pattern_owners = {}
+        for expr_key, (signature, patterns) in entries.items():
+            for pattern in patterns:
+                pattern_owners.setdefault(pattern, []).append((expr_key, signature[4]))
+
+        alternatives = frozenset((pattern, prefix) for pattern, owners in pattern_owners.items()
+                                 for _, prefix in owners)
+        if alternatives != self.alternatives:
+            if alternatives:
+                alternation = "|".join(
+                    re.escape(pattern) + ("" if prefix else r"(?!\w)")
+                    for pattern, prefix in sorted(alternatives, key=lambda a: (-len(a[0]), a[1]))
+                )
+                # Lookahead : une correspondance possible à chaque début de mot du texte
+                self.regex = re.compile(f"(?<!\\w)(?=({alternation}))")
+            else:
+                self.regex = None
+
+        fuzzy_index = FuzzyIndex(self.lenient)
+        for expr_key, (signature, patterns) in entries.items():
+            if signature[2] and patterns:
+                # Mode `lenient` (premier filtre) : toutes les variantes, pour le rappel
+                canonical = normalize_text(signature[0][0])
+                for pattern in patterns if self.lenient else {canonical} & patterns:
+                    fuzzy_index.add(expr_key, pattern, signature[3])
+
+        self.entries = entries
+        self.pattern_owners = pattern_owners
+        self.alternatives = alternatives
+        self.fuzzy_index = fuzzy_index if fuzzy_index.keys else None
+
+    def updated(self, expressions):
+        """Retourne un nouveau matcher synchronisé avec `expressions`, sans modifier celui-ci
+
+        Les expressions inchangées et l'alternance compilée sont réutilisées.
+        """
+        matcher = ExpressionMatcher(lenient=self.lenient)
+        matcher.entries = self.entries
+        matcher.pattern_owners = self.pattern_owners
+        matcher.alternatives = self.alternatives
+        matcher.regex = self.regex
+        matcher.fuzzy_index = self.fuzzy_index
+        matcher.update(expressions)
+        return matcher
+
+    def find(self, text):
+        """Retourne {clé d'expression: [(début, fin), ...]}, positions dans `normalize_text(text)`"""
+        if not text or self.regex is None:
+            return {}
+
+        normalized = normalize_text(text)
+        found = {}
+        for match in self.regex.finditer(normalized):
+            span = (match.start(1), match.end(1))
+            whole_word = span[1] == len(normalized) or normalized[span[1]] == " "
+            for expr_key, prefix in self.pattern_owners[match.group(1)]:
+                if prefix or whole_word:
+                    found.setdefault(expr_key, []).append(span)
+
+        # Recherche approximative seulement pour les expressions non trouvées telles quelles
+        if self.fuzzy_index:
+            fuzzy_found = self.fuzzy_index.search(normalized)
+            if fuzzy_found:
+                # Positions (en caractères) de chaque mot du texte normalisé
+                word_spans = [(m.start(), m.end()) for m in re.finditer(r"\S+", normalized)]
+                for expr_key, spans in fuzzy_found.items():
+                    if expr_key not in found:
+                        found[expr_key] = [(word_spans[start][0], word_spans[stop - 1][1]) for start, stop in spans]
+        return found
+
+    def match(self, text):
+        """Retourne {clé d'expression: nombre d'occurrences} pour toutes les expressions trouvées"""
+        return {expr_key: len(spans) for expr_key, spans in self.find(text).items()}
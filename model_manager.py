@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from asr_backends import create_backend
+from batching import BatchingTranscriber
+from inference_pool import InferencePool
+from resampler import PIPELINE_RATE
+
+
+def model_key(config):
+    """Identifie un modèle chargé : moteur, taille, quantification, matériel, processus,
+    puis les réglages de son transcripteur (lots, ou cœurs et mémoire partagée des processus)"""
+    asr_config = config.get("asr_config", {})
+    processes = asr_config.get("processes", 0)
+    if processes:
+        affinity = tuple(tuple(cores) if isinstance(cores, list) else cores
+                         for cores in asr_config.get("cpu_affinity") or [])
+        transcriber = (affinity, asr_config.get("slot_seconds", 30))
+    else:
+        transcriber = (asr_config.get("batch_size", 1), asr_config.get("batch_wait_ms", 0))
+    return (asr_config.get("engine", "whisper"), config["whisper_model"],
+            asr_config.get("compute_type", "int8"), asr_config.get("device", "cpu"),
+            processes) + transcriber
+
+
+class LoadedModel:
+    """Un moteur ASR chargé et son transcripteur (par lots, ou dans des processus séparés)"""
+
+    def __init__(self, key, backend, transcriber):
+        self.key = key
+        self.backend = backend
+        self.transcriber = transcriber
+
+    def describe(self):
+        return self.backend.describe()
+
+    def close(self):
+        self.transcriber.close()
+
+    def get_stats(self):
+        """État des processus d'inférence (None si le modèle tourne dans ce processus)"""
+        get_stats = getattr(self.transcriber, 'get_stats', None)
+        return get_stats() if get_stats else None
+
+
+class ModelManager:
+    """Charge les modèles ASR et bascule de l'un à l'autre sans interrompre la détection.
+
+    Le modèle actif (`active`) est remplacé d'un seul coup, une fois le
+    nouveau chargé et préchauffé en arrière-plan ; les transcriptions en
+    cours finissent sur l'ancien. Les `cache_size` derniers modèles restent
+    chargés, si bien que revenir à l'un d'eux est instantané ; au-delà, le
+    moins récemment utilisé est libéré.
+    """
+
+    def __init__(self, cache_size=2, on_batch=None, on_change=None):
+        self.cache_size = max(1, cache_size)
+        self.on_batch = on_batch
+        self.on_change = on_change
+
+        self.cache = OrderedDict()
+        self.active = None
+        self.loading = None
+        self.in_flight = set()
+        self.requested = None
+        self.last_load_seconds = None
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def build(self, config):
+        """Charge le modèle décrit par la config (sans l'activer)"""
+        key = model_key(config)
+        with self.lock:
+            loaded = self.cache.get(key)
+            if loaded:
+                self.cache.move_to_end(key)
+                return loaded
+            # Même modèle chargé dans ce processus, seuls les lots changent : il est réutilisé
+            shared = next((cached.backend for cached in self.cache.values()
+                           if cached.key[:5] == key[:5] and not key[4]), None)
+
+        asr_config = config.get("asr_config", {})
+        processes = asr_config.get("processes", 0)
+        if shared:
+            print(f"🔁 Modèle {shared.describe()} réutilisé avec de nouveaux réglages de lots")
+            return LoadedModel(key, shared, self.batching(shared, asr_config))
+
+        backend = create_backend(config)
+        print(f"📥 Chargement du modèle {backend.describe()}"
+              + (f" dans {processes} processus..." if processes else "..."))
+        start = time.perf_counter()
+        if processes:
+            # Le modèle n'est chargé que dans les processus d'inférence
+            transcriber = InferencePool(
+                config,
+                processes=processes,
+                cpu_affinity=asr_config.get("cpu_affinity"),
+                slot_seconds=asr_config.get("slot_seconds", 30),
+                on_batch=self.on_batch
+            )
+            transcriber.start()
+        else:
+            backend.load()
+            transcriber = self.batching(backend, asr_config)
+        self.last_load_seconds = round(time.perf_counter() - start, 3)
+        print(f"✅ Modèle {backend.describe()} chargé")
+        return LoadedModel(key, backend, transcriber)
+
+    def batching(self, backend, asr_config):
+        return BatchingTranscriber(
+            backend,
+            batch_size=asr_config.get("batch_size", 1),
+            max_wait_ms=asr_config.get("batch_wait_ms", 0),
+            on_batch=self.on_batch
+        )
+
+    def warm_up(self, loaded):
+        """Transcrit une seconde de silence pour amorcer le modèle avant les vrais segments"""
+        start = time.perf_counter()
+        try:
+            loaded.transcriber.transcribe(np.zeros(PIPELINE_RATE, dtype=np.float32))
+            print(f"🔥 Modèle préchauffé en {time.perf_counter() - start:.1f} s")
+        except Exception as e:
+            print(f"⚠️ Préchauffage du modèle impossible: {e}")
+
+    def activate(self, loaded):
+        """Fait du modèle le modèle actif et libère les modèles en trop"""
+        self.store(loaded, activate=True)
+        self.notify()
+
+    def store(self, loaded, activate=False):
+        """Met un modèle en cache (et l'active), en libérant ceux qu'il remplace ou qui sont en trop"""
+        released = []
+        with self.lock:
+            current = self.cache.get(loaded.key)
+            if current is not None and current is not loaded:
+                if activate or current is not self.active:
+                    released.append(current)
+                else:
+                    # Déjà chargé et actif : le doublon est libéré, pas le modèle en service
+                    released.append(loaded)
+                    loaded = current
+            if activate:
+                self.active = loaded
+            self.cache[loaded.key] = loaded
+            self.cache.move_to_end(loaded.key)
+            # Le moins récemment utilisé part en premier, jamais le modèle actif
+            for key in list(self.cache):
+                if len(self.cache) <= self.cache_size:
+                    break
+                if self.cache[key] is not self.active:
+                    released.append(self.cache.pop(key))
+
+        # Les transcriptions en cours gardent leur référence : le modèle est libéré après
+        for old in released:
+            print(f"🗑️ Modèle {old.describe()} libéré")
+            old.close()
+
+    def switch(self, config):
+        """Bascule vers le modèle de la config : immédiat s'il est en cache, sinon chargé en arrière-plan"""
+        key = model_key(config)
+        with self.lock:
+            self.requested = key
+            cached = self.cache.get(key)
+            if self.active and self.active.key == key:
+                return
+            # Déjà en cours de chargement : il sera activé à la fin, puisque c'est le modèle demandé
+            loading = key in self.in_flight
+            if not cached and not loading:
+                self.loading = key
+                self.in_flight.add(key)
+        if loading:
+            return
+        if cached:
+            print(f"🔁 Retour au modèle {cached.describe()} (en cache)")
+            self.activate(cached)
+            return
+
+        snapshot = dict(config, asr_config=dict(config.get("asr_config", {})))
+        threading.Thread(target=self.load_in_background, args=(snapshot, key),
+                         name="model-loader", daemon=True).start()
+
+    def load_in_background(self, config, key):
+        self.notify()
+        try:
+            loaded = self.build(config)
+            self.warm_up(loaded)
+            self.last_error = None
+            # Si un autre modèle a été demandé entre-temps, celui-ci reste seulement en cache
+            self.store(loaded, activate=self.requested == key)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ Erreur chargement modèle: {e}")
+        finally:
+            with self.lock:
+                self.in_flight.discard(key)
+                if self.loading == key:
+                    self.loading = None
+            self.notify()
+
+    def notify(self):
+        if self.on_change:
+            self.on_change(self.get_stats())
+
+    def get_stats(self):
+        """État des modèles pour l'API web"""
+        with self.lock:
+            return {
+                'active': self.active.describe() if self.active else None,
+                'loading': " ".join(self.loading[:2]) if self.loading else None,
+                'cached': [loaded.describe() for loaded in self.cache.values()],
+                'last_load_seconds': self.last_load_seconds,
+                'workers': self.active.get_stats() if self.active else None,
+                'error': self.last_error
+            }
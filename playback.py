@@ -0,0 +1,161 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class PlaybackJob:
+    """Liste de sons (chemin, à garder en cache) à jouer à la suite, avec une pause entre chacun"""
+
+    def __init__(self, sounds, pause=0.0, on_done=None):
+        self.sounds = sounds
+        self.pause = pause
+        self.on_done = on_done
+
+
+class PlaybackEngine:
+    """Moteur de lecture non bloquant.
+
+    Les sons sont décodés une fois puis gardés dans un cache LRU
+    (`cache_size` sons). Un thread dédié joue les demandes une par une,
+    dans l'ordre d'arrivée : deux actions simultanées ne se marchent plus
+    dessus. La fin d'un son est connue d'avance (durée du son décodé) : le
+    thread dort jusque-là au lieu de sonder le mixer, et les intervalles de
+    lecture (début, fin) sont exposés pour couper le micro exactement.
+
+    `prepare(sound)` calcule, au décodage, ce qui doit accompagner le son
+    (la référence d'écho) : c'est gardé avec lui dans le cache et passé à
+    `on_start(path, sound, start, prepared)`, appelé juste avant la lecture.
+    """
+
+    def __init__(self, cache_size=16, on_start=None, on_end=None, prepare=None):
+        self.cache_size = max(1, cache_size)
+        self.on_start = on_start
+        self.on_end = on_end
+        self.prepare = prepare
+
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.interrupt = threading.Event()
+        self.thread = None
+
+        # Intervalles (début, fin) des derniers sons joués, en temps time.time()
+        self.windows = deque(maxlen=32)
+        self.current = None
+
+    def start(self):
+        """Démarre le thread de lecture"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.interrupt.clear()
+        self.thread = threading.Thread(target=self.run, name="playback", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Coupe le son en cours et arrête le thread"""
+        self.interrupt.set()
+        self.jobs.put(None)
+
+    def load(self, path, cache=True):
+        """Retourne le son décodé et ce que `prepare` en a tiré (depuis le cache s'il y est déjà)"""
+        path = str(path)
+        key = (path, os.path.getmtime(path))
+
+        with self.cache_lock:
+            loaded = self.cache.get(key)
+            if loaded is not None:
+                self.cache.move_to_end(key)
+                return loaded
+
+        import pygame
+        sound = pygame.mixer.Sound(path)
+        prepared = None
+        if self.prepare:
+            try:
+                prepared = self.prepare(sound)
+            except Exception as e:
+                print(f"⚠️ Préparation du son impossible ({path}): {e}")
+        loaded = (sound, prepared)
+        if cache:
+            with self.cache_lock:
+                self.cache[key] = loaded
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return loaded
+
+    def preload(self, paths):
+        """Décode à l'avance les sons donnés (ignorés s'ils sont introuvables)"""
+        for path in paths:
+            try:
+                self.load(path)
+            except Exception as e:
+                print(f"⚠️ Son non préchargé ({path}): {e}")
+
+    def play(self, sounds, pause=0.0, on_done=None):
+        """Ajoute une demande de lecture de sons [(chemin, à garder en cache), ...]
+
+        Rend la main tout de suite ; `on_done(succès)` est appelé à la fin.
+        """
+        self.start()
+        self.jobs.put(PlaybackJob(list(sounds), pause, on_done))
+
+    @property
+    def playing(self):
+        return self.current is not None or not self.jobs.empty()
+
+    def overlaps(self, start, end, tail=0.0):
+        """L'intervalle [start, end] recouvre-t-il une lecture (prolongée de `tail` s) ?"""
+        current = self.current
+        if current and start <= current[1] + tail and end >= current[0]:
+            return True
+        return any(start <= w_end + tail and end >= w_start for w_start, w_end in list(self.windows))
+
+    def run(self):
+        """Boucle du thread de lecture"""
+        while True:
+            job = self.jobs.get()
+            if job is None or self.interrupt.is_set():
+                return
+
+            success = True
+            for i, (path, cache) in enumerate(job.sounds):
+                if i and job.pause and self.interrupt.wait(job.pause):
+                    return
+                try:
+                    sound, prepared = self.load(path, cache)
+                except Exception as e:
+                    print(f"❌ Erreur lecture {path}: {e}")
+                    success = False
+                    continue
+
+                self.play_sound(sound, path, prepared)
+                if self.interrupt.is_set():
+                    return
+
+            if job.on_done:
+                try:
+                    job.on_done(success)
+                except Exception as e:
+                    print(f"⚠️ Erreur fin de lecture: {e}")
+
+    def play_sound(self, sound, path, prepared=None):
+        """Joue un son et rend la main à sa fin"""
+        length = sound.get_length()
+        # Annoncé avant de jouer : les premiers blocs du micro ont déjà leur référence
+        start = time.time()
+        self.current = (start, start + length)
+        if self.on_start:
+            self.on_start(path, sound, start, prepared)
+        channel = sound.play()
+
+        self.interrupt.wait(length)
+        if self.interrupt.is_set() and channel:
+            channel.stop()
+
+        end = time.time()
+        self.windows.append((start, end))
+        self.current = None
+        if self.on_end:
+            self.on_end(path, sound, start, end)
@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+# Formats compressés possibles via ffmpeg : (extension, options d'encodage)
+ENCODERS = {
+    "flac": (".flac", ["-c:a", "flac"]),
+    "opus": (".ogg", ["-c:a", "libopus"]),
+}
+
+
+class RecordingStore:
+    """Stockage des enregistrements de détection, avec index et rotation.
+
+    Les enregistrements sont écrits en WAV, ou compressés en FLAC/Opus si
+    ffmpeg est disponible. Un fichier d'index (`index.json`) décrit chaque
+    enregistrement pour que l'interface web puisse les lister sans parcourir
+    le dossier. Après chaque ajout, les plus vieux (âge) puis les moins
+    récemment écoutés (LRU) sont supprimés pour respecter les limites.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory, recording_config=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(exist_ok=True)
+        self.index_path = self.directory / self.INDEX_FILE
+        self.lock = threading.Lock()
+        self.configure(recording_config or {})
+        self.index = self.load_index()
+
+    def configure(self, recording_config):
+        """Applique les réglages de format et de rétention"""
+        self.format = recording_config.get("format", "wav")
+        self.opus_bitrate = recording_config.get("opus_bitrate", "24k")
+        self.max_total_bytes = int(recording_config.get("max_total_mb", 500) * 1024 * 1024)
+        self.max_count = recording_config.get("max_count", 1000)
+        self.max_age = recording_config.get("max_age_days", 30) * 86400
+
+        self.ffmpeg = shutil.which("ffmpeg")
+        if self.format in ENCODERS and not self.ffmpeg:
+            print(f"⚠️ ffmpeg introuvable, enregistrements en WAV au lieu de {self.format}")
+            self.format = "wav"
+        elif self.format != "wav" and self.format not in ENCODERS:
+            print(f"⚠️ Format d'enregistrement inconnu ({self.format}), utilisation du WAV")
+            self.format = "wav"
+
+    def load_index(self):
+        """Charge l'index, ou le reconstruit à partir du dossier s'il n'existe pas"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        index = {}
+        for path in self.directory.iterdir():
+            if path.name == self.INDEX_FILE or not path.is_file():
+                continue
+            stat = path.stat()
+            index[path.name] = {
+                'size': stat.st_size,
+                'created': stat.st_mtime,
+                'last_access': stat.st_mtime
+            }
+        self.write_index(index)
+        return index
+
+    def write_index(self, index=None):
+        """Écrit l'index de manière atomique (fichier temporaire puis renommage)"""
+        index = self.index if index is None else index
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            # mkstemp crée le fichier en 0600 : on garde les droits du fichier remplacé
+            try:
+                mode = stat.S_IMODE(os.stat(self.index_path).st_mode)
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.index_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def write_wav(self, path, audio_data, rate, channels, sample_width):
+        """Écrit le PCM brut dans un fichier WAV"""
+        wf = wave.open(str(path), 'wb')
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(audio_data)
+        wf.close()
+
+    def encode(self, path, audio_data, rate, channels, sample_width):
+        """Compresse le PCM avec ffmpeg (lu sur l'entrée standard)"""
+        codec_args = ENCODERS[self.format][1]
+        if self.format == "opus":
+            codec_args = codec_args + ["-b:a", self.opus_bitrate]
+
+        sample_format = {1: "u8", 2: "s16le", 4: "s32le"}[sample_width]
+        subprocess.run(
+            [self.ffmpeg, "-loglevel", "error", "-y",
+             "-f", sample_format, "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+             *codec_args, str(path)],
+            input=audio_data, check=True
+        )
+
+    def save(self, name, audio_data, rate, channels, sample_width=2, metadata=None):
+        """Enregistre un passage audio et retourne le nom du fichier créé"""
+        extension = ENCODERS[self.format][0] if self.format in ENCODERS else ".wav"
+        filename = f"{name}{extension}"
+        path = self.directory / filename
+
+        try:
+            if self.format in ENCODERS:
+                self.encode(path, audio_data, rate, channels, sample_width)
+            else:
+                self.write_wav(path, audio_data, rate, channels, sample_width)
+        except Exception as e:
+            print(f"⚠️ Encodage {self.format} impossible ({e}), enregistrement en WAV")
+            filename = f"{name}.wav"
+            path = self.directory / filename
+            self.write_wav(path, audio_data, rate, channels, sample_width)
+
+        now = time.time()
+        with self.lock:
+            self.index[filename] = {
+                'size': path.stat().st_size,
+                'created': now,
+                'last_access': now,
+                **(metadata or {})
+            }
+            self.evict()
+            self.write_index()
+        return filename
+
+    def touch(self, filename):
+        """Marque un enregistrement comme écouté (pour l'éviction LRU)"""
+        with self.lock:
+            entry = self.index.get(filename)
+            if entry:
+                entry['last_access'] = time.time()
+                self.write_index()
+
+    def evict(self):
+        """Supprime les enregistrements trop vieux puis les moins récemment écoutés (verrou déjà pris)"""
+        now = time.time()
+        removed = [f for f, entry in self.index.items() if self.max_age and now - entry['created'] > self.max_age]
+
+        remaining = sorted((f for f in self.index if f not in removed),
+                           key=lambda f: self.index[f]['last_access'])
+        total_bytes = sum(self.index[f]['size'] for f in remaining)
+        while remaining and ((self.max_count and len(remaining) > self.max_count)
+                             or (self.max_total_bytes and total_bytes > self.max_total_bytes)):
+            filename = remaining.pop(0)
+            total_bytes -= self.index[filename]['size']
+            removed.append(filename)
+
+        for filename in removed:
+            del self.index[filename]
+            try:
+                (self.directory / filename).unlink()
+            except FileNotFoundError:
+                pass
+
+        if removed:
+            print(f"🧹 {len(removed)} enregistrement(s) supprimé(s) (rotation)")
+
+    def list(self):
+        """Liste des enregistrements, du plus récent au plus ancien"""
+        with self.lock:
+            recordings = [{'filename': f, **entry} for f, entry in self.index.items()]
+        return sorted(recordings, key=lambda r: r['created'], reverse=True)
+
+    def get_stats(self):
+        """Occupation du stockage pour l'API web"""
+        with self.lock:
+            return {
+                'count': len(self.index),
+                'total_bytes': sum(entry['size'] for entry in self.index.values()),
+                'format': self.format
+            }
+
+    def path(self, filename):
+        """Chemin d'un enregistrement connu de l'index, sinon None"""
+        with self.lock:
+            if filename not in self.index:
+                return None
+        return self.directory / filename
@@ -0,0 +1,73 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Fréquence de travail du pipeline (VAD, Whisper, enregistrements)
+PIPELINE_RATE = 16000
+
+
+class PolyphaseResampler:
+    """Rééchantillonneur polyphase (filtre passe-bas à sinus cardinal fenêtré).
+
+    Conserve l'historique entre deux appels : le flux peut être traité bloc
+    par bloc sans discontinuité aux frontières.
+    """
+
+    def __init__(self, rate_in, rate_out, taps_per_phase=16):
+        divisor = gcd(rate_in, rate_out)
+        self.up = rate_out // divisor
+        self.down = rate_in // divisor
+        self.taps = taps_per_phase
+
+        # Filtre prototype à la fréquence suréchantillonnée, coupure à la plus basse des deux Nyquist
+        length = taps_per_phase * self.up
+        cutoff = 1.0 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        prototype = cutoff * np.sinc(cutoff * n) * np.kaiser(length, 5.0) * self.up
+
+        # Une ligne par phase, coefficients inversés pour un produit scalaire direct
+        self.phases = prototype.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32)
+
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.offset = 0
+
+    def process(self, samples):
+        """Rééchantillonne un bloc d'échantillons float32"""
+        buffer = np.concatenate((self.history, samples))
+        total_up = len(samples) * self.up
+
+        # Index (dans le domaine suréchantillonné) des échantillons de sortie de ce bloc
+        positions = np.arange(self.offset, total_up, self.down)
+        self.offset = (positions[-1] + self.down - total_up) if len(positions) else self.offset - total_up
+        self.history = buffer[len(buffer) - (self.taps - 1):]
+
+        if not len(positions):
+            return np.zeros(0, dtype=np.float32)
+
+        windows = sliding_window_view(buffer, self.taps)[positions // self.up]
+        return np.einsum('ij,ij->i', windows, self.phases[positions % self.up]).astype(np.float32)
+
+
+class CaptureConverter:
+    """Convertit les blocs capturés en PCM int16 mono à PIPELINE_RATE, une seule fois à la capture"""
+
+    def __init__(self, rate, channels):
+        self.channels = channels
+        self.resampler = PolyphaseResampler(rate, PIPELINE_RATE) if rate != PIPELINE_RATE else None
+
+    @property
+    def passthrough(self):
+        return self.channels == 1 and self.resampler is None
+
+    def process(self, data):
+        """Retourne le bloc converti (bytes)"""
+        if self.passthrough:
+            return data
+
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Tampon circulaire préalloué, entre le callback du micro et le thread de lecture.
+
+    Un seul producteur (`write`, thread PortAudio) et un seul consommateur
+    (`read`) : chacun ne modifie que son propre compteur (total écrit, total
+    lu), sans verrou. Le producteur n'attend jamais ; si le consommateur a
+    pris plus de `capacity` échantillons de retard, les plus anciens sont
+    écrasés et le consommateur repart sur l'audio le plus récent (compté
+    dans `overruns`).
+
+    `read` rend une vue sur le tampon, sans copie, valable jusqu'à ce que
+    le producteur en fasse le tour : il faut la traiter (ou la copier)
+    avant de lire à nouveau `capacity` échantillons plus loin.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.written = 0
+        self.read_position = 0
+        self.overruns = 0
+        self.available = threading.Event()
+
+    def write(self, samples):
+        """Ajoute des échantillons (côté producteur)"""
+        n = len(samples)
+        if n > self.capacity:
+            self.written += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        if first < n:
+            self.data[:n - first] = samples[first:]
+        # Le compteur n'avance qu'une fois les données en place
+        self.written += n
+        self.available.set()
+
+    def wait(self, n, timeout=None):
+        """Attend que `n` échantillons soient disponibles ; retourne False si le délai expire"""
+        while self.written - self.read_position < n:
+            self.available.clear()
+            if self.written - self.read_position >= n:
+                break
+            if not self.available.wait(timeout):
+                return False
+        return True
+
+    def read(self, n, timeout=None):
+        """Retourne les `n` échantillons suivants (côté consommateur), ou None si le délai expire
+
+        Sans copie quand la fenêtre ne chevauche pas la fin du tampon (toujours
+        le cas si `capacity` est un multiple de `n`).
+        """
+        if not self.wait(n, timeout):
+            return None
+
+        # Le producteur a fait le tour : on saute l'audio écrasé
+        if self.written - self.read_position > self.capacity:
+            self.overruns += 1
+            self.read_position = self.written - n
+
+        start = self.read_position % self.capacity
+        if start + n <= self.capacity:
+            window = self.data[start:start + n]
+        else:
+            window = np.concatenate((self.data[start:], self.data[:start + n - self.capacity]))
+        self.read_position += n
+        return window
+
+    @property
+    def buffered(self):
+        """Échantillons écrits et pas encore lus"""
+        return min(self.written - self.read_position, self.capacity)
@@ -0,0 +1,73 @@
+import threading
+from collections import Counter, deque
+
+DEFAULT_ROOM = "default"
+
+
+class Room:
+    """Une pièce écoutée : une entrée audio avec son propre découpage et ses statistiques.
+
+    Toutes les pièces partagent le même modèle de transcription ; chacune
+    garde son anti-doublon, ses compteurs et, si `expressions` est donné,
+    ne réagit qu'à ce sous-ensemble d'expressions.
+    """
+
+    def __init__(self, room_id, name, audio_config, expressions=None):
+        self.id = room_id
+        self.name = name
+        self.audio_config = audio_config
+        self.expressions = set(expressions) if expressions is not None else None
+
+        self.last_detections = deque(maxlen=10)
+        self.detection_stats = Counter()
+        self.segments = Counter()
+        self.lock = threading.Lock()
+
+    def listens_to(self, expr_key):
+        """L'expression est-elle suivie dans cette pièce ?"""
+        return self.expressions is None or expr_key in self.expressions
+
+    def count_segment(self, outcome):
+        with self.lock:
+            self.segments[outcome] += 1
+
+    def count_detection(self, expr_key, matches):
+        with self.lock:
+            self.detection_stats[expr_key] += matches
+
+    def get_stats(self):
+        """Statistiques de la pièce pour l'API web"""
+        with self.lock:
+            return {
+                'name': self.name,
+                'device_index': self.audio_config.get("device_index"),
+                'expressions': sorted(self.expressions) if self.expressions is not None else None,
+                'detection_stats': dict(self.detection_stats),
+                'segments': dict(self.segments)
+            }
+
+
+def load_rooms(config):
+    """Construit les pièces décrites par `rooms` dans la config.
+
+    Chaque entrée peut surcharger les réglages de `audio_config` (micro via
+    `device_index`, `rate`, `channels`...). Sans `rooms`, une seule pièce
+    utilise le micro par défaut.
+    """
+    audio_config = config["audio_config"]
+    entries = config.get("rooms") or [{"id": DEFAULT_ROOM, "name": "Micro principal"}]
+
+    rooms = {}
+    for i, entry in enumerate(entries):
+        room_id = str(entry.get("id") or f"room{i + 1}")
+        if room_id in rooms:
+            print(f"⚠️ Pièce '{room_id}' définie plusieurs fois, seule la première est gardée")
+            continue
+        overrides = {k: v for k, v in entry.items() if k not in ("id", "name", "expressions")}
+        rooms[room_id] = Room(
+            room_id,
+            entry.get("name", room_id),
+            dict(audio_config, **overrides),
+            entry.get("expressions")
+        )
+    return rooms
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque, Counter
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class SegmentQueue:
+    """File bornée de segments audio alimentant un nombre fixe de workers.
+
+    Chaque source (pièce) a sa propre file, bornée à `max_size` ; les
+    workers servent les sources à tour de rôle, si bien qu'une pièce
+    bruyante ne peut pas affamer les autres.
+
+    Quand la file d'une source est pleine, la politique décide du sort du segment :
+    - `drop_oldest` : on jette le plus ancien segment en attente
+    - `drop_newest` : on jette le nouveau segment
+    - `block` : le thread d'enregistrement attend qu'une place se libère
+      (tant que les workers ne tournent pas, personne ne libère de place :
+      comme `drop_oldest`, les segments les plus récents sont gardés)
+
+    Avant `start`, les segments attendent dans la file, dans sa limite.
+    """
+
+    def __init__(self, handler, workers=1, max_size=8, drop_policy="drop_oldest"):
+        if drop_policy not in DROP_POLICIES:
+            print(f"⚠️ Politique de file invalide ({drop_policy}), utilisation de 'drop_oldest'")
+            drop_policy = "drop_oldest"
+
+        self.handler = handler
+        self.num_workers = max(1, workers)
+        self.max_size = max(1, max_size)
+        self.drop_policy = drop_policy
+
+        # Une file par source, et l'ordre de passage des sources ayant du travail
+        self.items = {}
+        self.turns = deque()
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = False
+        self.generation = 0
+
+        # Compteurs
+        self.enqueued = Counter()
+        self.processed = Counter()
+        self.dropped = Counter()
+        self.active_workers = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        """Démarre les workers"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            # Les workers d'un démarrage précédent s'arrêtent d'eux-mêmes
+            self.generation += 1
+            generation = self.generation
+
+        self.threads = []
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self.worker, args=(generation,),
+                                      name=f"segment-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Arrête les workers et vide la file"""
+        with self.condition:
+            self.running = False
+            self.items.clear()
+            self.turns.clear()
+            self.condition.notify_all()
+
+    def put(self, *args, source=None):
+        """Ajoute un segment de la source `source` ; retourne False s'il a été rejeté"""
+        item = (time.time(), args)
+
+        with self.condition:
+            items = self.items.setdefault(source, deque())
+            if len(items) >= self.max_size:
+                if self.drop_policy == "block":
+                    while self.running and len(items) >= self.max_size:
+                        self.condition.wait(0.1)
+                    items = self.items.setdefault(source, deque())
+                    if len(items) >= self.max_size:
+                        items.popleft()
+                        self.dropped[source] += 1
+                elif self.drop_policy == "drop_newest":
+                    self.dropped[source] += 1
+                    return False
+                else:
+                    items.popleft()
+                    self.dropped[source] += 1
+
+            # (une source vidée par `drop_oldest` a déjà son tour)
+            if source not in self.turns:
+                self.turns.append(source)
+            items.append(item)
+            self.enqueued[source] += 1
+            self.condition.notify_all()
+            return True
+
+    def next_item(self):
+        """Dépile le segment de la source dont c'est le tour (verrou déjà pris)"""
+        source = self.turns.popleft()
+        items = self.items[source]
+        item = items.popleft()
+        # La source repasse en fin de tour si elle a encore du travail
+        if items:
+            self.turns.append(source)
+        return source, item
+
+    def worker(self, generation):
+        """Boucle d'un worker : dépile et traite les segments"""
+        while True:
+            with self.condition:
+                while self.running and self.generation == generation and not self.turns:
+                    self.condition.wait()
+                if not self.running or self.generation != generation:
+                    return
+                source, (captured_at, args) = self.next_item()
+                self.active_workers += 1
+                self.condition.notify_all()
+
+            try:
+                self.handler(*args)
+            except Exception as e:
+                print(f"⚠️ Erreur worker: {e}")
+            finally:
+                # Retard sur le temps réel : fin de traitement vs fin de capture
+                lag = time.time() - captured_at
+                with self.condition:
+                    self.active_workers -= 1
+                    self.processed[source] += 1
+                    self.last_lag = lag
+                    self.max_lag = max(self.max_lag, lag)
+
+    def get_stats(self):
+        """Retourne les compteurs de la file pour l'API web (totaux et détail par source)"""
+        with self.condition:
+            now = time.time()
+            oldest_wait = max((now - items[0][0] for items in self.items.values() if items), default=0.0)
+            sources = {
+                str(source): {
+                    'depth': len(self.items.get(source, ())),
+                    'enqueued': self.enqueued[source],
+                    'processed': self.processed[source],
+                    'dropped': self.dropped[source]
+                }
+                for source in self.enqueued.keys() | self.dropped.keys()
+            }
+            return {
+                'depth': sum(len(items) for items in self.items.values()),
+                'max_size': self.max_size,
+                'workers': self.num_workers,
+                'active_workers': self.active_workers,
+                'drop_policy': self.drop_policy,
+                'enqueued': sum(self.enqueued.values()),
+                'processed': sum(self.processed.values()),
+                'dropped': sum(self.dropped.values()),
+                'lag_seconds': round(max(self.last_lag, oldest_wait), 3),
+                'max_lag_seconds': round(self.max_lag, 3),
+                'sources': sources
+            }
@@ -0,0 +1,135 @@
+import collections
+import numpy as np
+import webrtcvad
+
+from resampler import PIPELINE_RATE
+
+
+def frame_levels(frames):
+    """Crête et énergie (RMS) de chaque trame d'un tableau (n_trames, taille) en int16, vectorisé"""
+    peaks = np.maximum(frames.max(axis=1).astype(np.int32), -frames.min(axis=1).astype(np.int32))
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return peaks, rms
+
+
+class UtteranceSegmenter:
+    """Découpe le flux audio en énoncés complets à l'aide du VAD.
+
+    Le flux est du PCM int16 mono à PIPELINE_RATE (converti à la capture).
+    Chaque trame de 30 ms est classée une seule fois (parole / silence), au
+    fil de l'eau, et sa crête et son énergie sont calculées en même temps.
+    Un énoncé s'ouvre quand la majorité des trames récentes contient de la
+    parole, et se ferme après `silence_ms` de silence consécutif ou quand il
+    atteint `max_utterance_seconds`. Seuls les énoncés complets sont rendus,
+    avec les statistiques de leurs trames (plus besoin de réanalyser l'audio).
+    """
+
+    def __init__(self, aggressiveness=2, frame_ms=30, padding_ms=300,
+                 silence_ms=600, max_utterance_seconds=10, min_utterance_ms=300,
+                 onset_ratio=0.6):
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.frame_ms = frame_ms
+        self.frame_size = int(PIPELINE_RATE * frame_ms / 1000)
+
+        self.padding_frames = max(1, padding_ms // frame_ms)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = max(1, int(max_utterance_seconds * 1000 / frame_ms))
+        self.min_frames = max(1, min_utterance_ms // frame_ms)
+        self.onset_ratio = onset_ratio
+
+        self.reset()
+
+    def reset(self):
+        """Remet à zéro l'état du découpage (énoncé en cours et reliquat)"""
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.ring = collections.deque(maxlen=self.padding_frames)
+        self.triggered = False
+        self.utterance = []
+        self.voiced_count = 0
+        self.trailing_silence = 0
+
+    def feed(self, data):
+        """Ajoute un bloc audio et retourne la liste des énoncés terminés [(bytes, stats), ...]"""
+        samples = np.concatenate((self.pending, np.frombuffer(data, dtype=np.int16)))
+        n_frames = len(samples) // self.frame_size
+        self.pending = samples[n_frames * self.frame_size:]
+        if not n_frames:
+            return []
+
+        frames = samples[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        peaks, rms = frame_levels(frames)
+
+        utterances = []
+        for frame, peak, energy in zip(frames, peaks, rms):
+            frame_bytes = frame.tobytes()
+            speech = self.vad.is_speech(frame_bytes, PIPELINE_RATE)
+            utterance = self.process_frame((frame_bytes, speech, int(peak), float(energy)))
+            if utterance:
+                utterances.append(utterance)
+
+        return utterances
+
+    def process_frame(self, frame):
+        """Fait avancer la machine à états d'une trame (bytes, parole, crête, rms) ; retourne un énoncé s'il se termine"""
+        speech = frame[1]
+        if not self.triggered:
+            self.ring.append(frame)
+            voiced = sum(1 for f in self.ring if f[1])
+
+            # Début d'énoncé : assez de parole dans la fenêtre de pré-roll
+            if len(self.ring) == self.ring.maxlen and voiced >= self.onset_ratio * self.ring.maxlen:
+                self.triggered = True
+                self.utterance = list(self.ring)
+                self.voiced_count = voiced
+                self.trailing_silence = 0
+                self.ring.clear()
+            return None
+
+        self.utterance.append(frame)
+        if speech:
+            self.voiced_count += 1
+            self.trailing_silence = 0
+        else:
+            self.trailing_silence += 1
+
+        if self.trailing_silence >= self.silence_frames or len(self.utterance) >= self.max_frames:
+            return self.close_utterance()
+        return None
+
+    def close_utterance(self):
+        """Termine l'énoncé en cours ; les énoncés trop courts sont ignorés"""
+        frames = self.utterance
+        voiced = self.voiced_count
+
+        self.triggered = False
+        self.utterance = []
+        self.voiced_count = 0
+        self.trailing_silence = 0
+
+        if voiced < self.min_frames:
+            return None
+
+        # Statistiques déduites des trames déjà analysées
+        stats = {
+            'voice_ratio': voiced / len(frames),
+            'peak': max(f[2] for f in frames),
+            'rms': float(np.sqrt(np.mean([f[3] ** 2 for f in frames])))
+        }
+        return b''.join(f[0] for f in frames), stats
+
+    @property
+    def partial_ms(self):
+        """Durée (ms) de l'énoncé en cours, 0 s'il n'y en a pas"""
+        return len(self.utterance) * self.frame_ms if self.triggered else 0
+
+    def partial(self):
+        """Audio de l'énoncé en cours, pas encore terminé (None s'il n'y en a pas)"""
+        if not self.triggered:
+            return None
+        return b''.join(f[0] for f in self.utterance)
+
+    def flush(self):
+        """Retourne l'énoncé en cours (fin de flux), s'il existe"""
+        if self.triggered:
+            return self.close_utterance()
+        return None
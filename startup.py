@@ -0,0 +1,76 @@
+import threading
+import time
+from contextlib import contextmanager
+
+FINISHED = ("done", "skipped", "failed")
+
+
+class StartupTracker:
+    """Suivi des étapes du démarrage (micro, modèle, préchauffage).
+
+    Chaque étape passe de `pending` à `running` puis `done`, `skipped` ou
+    `failed`. On peut attendre la fin d'une étape, et `on_change` est
+    appelé à chaque changement (pour prévenir l'interface web).
+    """
+
+    def __init__(self, stages, on_change=None):
+        self.order = list(stages)
+        self.stages = {name: {'status': 'pending'} for name in self.order}
+        self.finished = {name: threading.Event() for name in self.order}
+        self.on_change = on_change
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+
+    def update(self, name, **fields):
+        with self.lock:
+            self.stages[name] = fields
+        if fields['status'] in FINISHED:
+            self.finished[name].set()
+        if self.on_change:
+            self.on_change(self.snapshot())
+
+    @contextmanager
+    def stage(self, name):
+        """Exécute une étape ; en cas d'erreur, elle et les suivantes sont marquées en échec"""
+        start = time.perf_counter()
+        self.update(name, status='running')
+        try:
+            yield
+        except Exception as e:
+            self.update(name, status='failed', error=str(e))
+            for later in self.order[self.order.index(name) + 1:]:
+                if not self.finished[later].is_set():
+                    self.update(later, status='failed', error="étape précédente en échec")
+            raise
+        self.update(name, status='done', seconds=round(time.perf_counter() - start, 2))
+
+    def skip(self, name):
+        self.update(name, status='skipped')
+
+    def wait(self, name, timeout=None):
+        """Attend la fin d'une étape ; retourne True si elle est terminée"""
+        return self.finished[name].wait(timeout)
+
+    def succeeded(self, name):
+        return self.stages[name]['status'] in ("done", "skipped")
+
+    @property
+    def ready(self):
+        return all(self.succeeded(name) for name in self.order)
+
+    def snapshot(self):
+        """État du démarrage pour l'API web"""
+        with self.lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+        if any(stage['status'] == 'failed' for stage in stages.values()):
+            state = 'failed'
+        elif all(stage['status'] in ("done", "skipped") for stage in stages.values()):
+            state = 'ready'
+        else:
+            state = 'starting'
+        return {
+            'state': state,
+            'ready': state == 'ready',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'stages': stages
+        }
@@ -2,14 +2,43 @@ class TicDetectorInterface {
     constructor() {
         this.currentConfig = {};
         this.currentStats = {};
+        this.detections = [];
+        this.cursor = null;
         this.isRecording = false;
+        this.startupState = 'ready';
         
         this.initEventListeners();
         this.initTabs();
-        this.loadData();
+        this.loadData().then(() => this.initEventStream());
+    }
+    
+    initEventStream() {
+        // Sans SSE, on se rabat sur une interrogation incrémentale
+        if (!window.EventSource) {
+            setInterval(() => this.updateStats(), 2000);
+            return;
+        }
+        
+        const source = new EventSource('/api/events');
+        
+        source.addEventListener('detection', (e) => {
+            const data = JSON.parse(e.data);
+            this.addDetections([data.detection]);
+            this.currentStats.detection_stats = data.detection_stats;
+            this.renderStats();
+            this.renderRecentDetections();
+        });
+        
+        source.addEventListener('status', (e) => {
+            this.setRecording(JSON.parse(e.data).is_recording);
+        });
+        
+        source.addEventListener('startup', (e) => {
+            this.setStartup(JSON.parse(e.data));
+        });
         
-        // Actualisation automatique des statistiques
-        setInterval(() => this.updateStats(), 2000);
+        // Après une coupure, on rattrape ce qui a pu être manqué
+        source.addEventListener('open', () => this.updateStats());
     }
     
     initEventListeners() {
@@ -72,11 +101,27 @@ class TicDetectorInterface {
     }
     
     async loadData() {
+        await this.loadHealth();
         await this.loadConfig();
         await this.updateStats();
         await this.loadExpressions();
     }
     
+    async loadHealth() {
+        try {
+            // 503 tant que le démarrage n'est pas terminé : le corps reste lisible
+            const response = await fetch('/api/health');
+            this.setStartup(await response.json());
+        } catch (error) {
+            console.error('Erreur chargement état:', error);
+        }
+    }
+    
+    setStartup(health) {
+        this.startupState = health.state;
+        this.setRecording(this.isRecording);
+    }
+    
     async loadConfig() {
         try {
             const response = await fetch('/api/config');
@@ -104,6 +149,7 @@ class TicDetectorInterface {
             const response = await fetch('/api/expressions');
             const expressions = await response.json();
             
+            this.currentConfig.expressions = expressions;
             this.renderExpressions(expressions);
             
         } catch (error) {
@@ -139,6 +185,10 @@ class TicDetectorInterface {
                         <span class="detail-label">Patterns:</span>
                         <span>${expr.patterns.join(', ')}</span>
                     </div>
+                    <div class="detail-row">
+                        <span class="detail-label">Approximatif:</span>
+                        <span>${expr.fuzzy ? 'Oui' : 'Non'}</span>
+                    </div>
                     <div class="detail-row">
                         <span class="detail-label">Action:</span>
                         <span>${this.getActionText(expr.action)}</span>
@@ -166,19 +216,14 @@ class TicDetectorInterface {
     
     async updateStats() {
         try {
-            const response = await fetch('/api/stats');
+            // Seules les détections postérieures au curseur sont renvoyées
+            const response = await fetch(`/api/stats?since=${this.cursor ?? 0}`);
             this.currentStats = await response.json();
             
-            // Mettre à jour le statut
-            this.isRecording = this.currentStats.is_recording;
-            const statusEl = document.getElementById('status');
-            statusEl.textContent = this.isRecording ? 'En cours' : 'Arrêté';
-            statusEl.className = `status ${this.isRecording ? 'recording' : 'stopped'}`;
-            
-            // Mettre à jour les boutons
-            document.getElementById('startBtn').disabled = this.isRecording;
-            document.getElementById('stopBtn').disabled = !this.isRecording;
+            this.addDetections(this.currentStats.detections || []);
+            this.cursor = this.currentStats.cursor;
             
+            this.setRecording(this.currentStats.is_recording);
             this.renderStats();
             this.renderRecentDetections();
             
@@ -187,6 +232,36 @@ class TicDetectorInterface {
         }
     }
     
+    addDetections(detections) {
+        detections.forEach(detection => {
+            if (this.cursor === null || detection.seq > this.cursor) {
+                this.detections.push(detection);
+                this.cursor = detection.seq;
+            }
+        });
+        this.detections = this.detections.slice(-10);
+    }
+    
+    setRecording(isRecording) {
+        // Mettre à jour le statut
+        this.isRecording = isRecording;
+        const statusEl = document.getElementById('status');
+        if (this.startupState === 'starting') {
+            statusEl.textContent = 'Chargement du modèle...';
+            statusEl.className = 'status starting';
+        } else if (this.startupState === 'failed') {
+            statusEl.textContent = 'Erreur au démarrage';
+            statusEl.className = 'status stopped';
+        } else {
+            statusEl.textContent = this.isRecording ? 'En cours' : 'Arrêté';
+            statusEl.className = `status ${this.isRecording ? 'recording' : 'stopped'}`;
+        }
+        
+        // Mettre à jour les boutons
+        document.getElementById('startBtn').disabled = this.isRecording;
+        document.getElementById('stopBtn').disabled = !this.isRecording;
+    }
+    
     renderStats() {
         const container = document.getElementById('statsContent');
         const stats = this.currentStats.detection_stats || {};
@@ -204,7 +279,7 @@ class TicDetectorInterface {
         
         Object.entries(stats).forEach(([key, count]) => {
             if (count > 0) {
-                const expr = this.currentStats.config?.expressions[key];
+                const expr = this.currentConfig.expressions?.[key];
                 const name = expr?.name || key;
                 html += `
                     <div class="stat-item">
@@ -225,14 +300,12 @@ class TicDetectorInterface {
     
     renderRecentDetections() {
         const container = document.getElementById('recentDetections');
-        const detections = this.currentStats.session_detections || [];
-        
-        const recent = detections.slice(-10).reverse();
+        const recent = this.detections.slice().reverse();
         
         container.innerHTML = recent.map(detection => `
             <div class="detection-item">
                 <div class="detection-info">
-                    <div class="detection-time">${new Date(detection.timestamp).toLocaleTimeString()}</div>
+                    <div class="detection-time">${new Date(detection.timestamp).toLocaleTimeString()}${detection.source_name ? ` · ${detection.source_name}` : ''}</div>
                     <div class="detection-text">"${detection.text}"</div>
                     <div class="detection-expression">→ ${detection.expression} (${detection.action})</div>
                 </div>
@@ -296,7 +369,7 @@ class TicDetectorInterface {
     
     async toggleExpression(key, enabled) {
         try {
-            const expr = this.currentStats.config.expressions[key];
+            const expr = this.currentConfig.expressions[key];
             expr.enabled = enabled;
             
             await fetch(`/api/expressions/${key}`, {
@@ -315,13 +388,15 @@ class TicDetectorInterface {
         document.getElementById('expressionForm').reset();
         document.getElementById('exprKey').value = '';
         document.getElementById('exprEnabled').checked = true;
+        document.getElementById('exprFuzzy').checked = false;
+        document.getElementById('exprPrefix').checked = false;
         
         this.loadMp3Files(); // Charger les MP3 disponibles
         document.getElementById('expressionModal').style.display = 'block';
     }
     
     async editExpression(key) {
-        const expr = this.currentStats.config.expressions[key];
+        const expr = this.currentConfig.expressions[key];
         
         document.getElementById('modalTitle').textContent = 'Modifier l\'Expression';
         document.getElementById('exprKey').value = key;
@@ -330,6 +405,8 @@ class TicDetectorInterface {
         document.getElementById('exprAction').value = expr.action;
         document.getElementById('exprMp3File').value = expr.mp3_file || '';
         document.getElementById('exprEnabled').checked = expr.enabled;
+        document.getElementById('exprFuzzy').checked = !!expr.fuzzy;
+        document.getElementById('exprPrefix').checked = !!expr.prefix;
         
         await this.loadMp3Files(); // Charger les MP3 disponibles
         document.getElementById('expressionModal').style.display = 'block';
@@ -358,7 +435,10 @@ class TicDetectorInterface {
             patterns: document.getElementById('exprPatterns').value.split('\n').filter(p => p.trim()),
             action: document.getElementById('exprAction').value,
             mp3_file: document.getElementById('exprMp3File').value,
-            enabled: document.getElementById('exprEnabled').checked
+            enabled: document.getElementById('exprEnabled').checked,
+            fuzzy: document.getElementById('exprFuzzy').checked,
+            fuzzy_distance: this.currentConfig.expressions?.[key]?.fuzzy_distance ?? 1,
+            prefix: document.getElementById('exprPrefix').checked
         };
         
         try {
@@ -389,6 +469,7 @@ class TicDetectorInterface {
             const newConfig = {
                 whisper_model: document.getElementById('whisperModel').value,
                 vad_config: {
+                    ...(this.currentConfig.vad_config || {}),
                     enabled: document.getElementById('vadEnabled').checked,
                     aggressiveness: parseInt(document.getElementById('vadAggressiveness').value, 10)
                 }
@@ -0,0 +1,176 @@
+import threading
+from collections import deque
+
+from matcher import normalize_text
+
+
+class LocalAgreement:
+    """Confirme les mots d'un énoncé en cours de transcription (accord local).
+
+    L'énoncé est retranscrit depuis son début à intervalles réguliers. Un
+    mot n'est confirmé que lorsque les `n` dernières transcriptions sont
+    d'accord sur lui et sur tout ce qui le précède : les mots de la fin,
+    encore instables, attendent la transcription suivante. Chaque mot n'est
+    confirmé qu'une fois ; ceux déjà confirmés ne sont plus remis en cause.
+
+    Whisper redécoupe parfois les mots déjà confirmés ("en vrai" devient
+    "envrai") : la suite d'une transcription est repérée par le texte déjà
+    confirmé (lettres sans espaces), pas par le nombre de mots.
+    """
+
+    def __init__(self, n=2):
+        self.n = max(1, n)
+        self.reset()
+
+    def reset(self):
+        """Nouvel énoncé"""
+        self.committed = []
+        self.hypotheses = deque(maxlen=self.n)
+
+    @staticmethod
+    def clean(words):
+        """Garde les mots non vides une fois normalisés (Whisper isole parfois la ponctuation)"""
+        return [w for w in words if normalize_text(w['word'])]
+
+    @staticmethod
+    def letters(word):
+        return normalize_text(word['word']).replace(" ", "")
+
+    def remainder(self, words):
+        """Mots d'une transcription qui suivent le texte déjà confirmé
+
+        Un mot à cheval sur la fin du texte confirmé n'en garde que la partie nouvelle.
+        """
+        skip = sum(len(self.letters(w)) for w in self.committed)
+        for i, word in enumerate(words):
+            letters = self.letters(word)
+            if skip < len(letters):
+                if skip:
+                    word = dict(word, word=letters[skip:])
+                return [word] + words[i + 1:]
+            skip -= len(letters)
+        return []
+
+    def insert(self, words):
+        """Ajoute une transcription de l'énoncé depuis son début ; retourne les mots nouvellement confirmés"""
+        self.hypotheses.append(self.clean(words))
+        if len(self.hypotheses) < self.n:
+            return []
+
+        # On ne compare que ce qui suit le texte déjà confirmé
+        tails = [self.remainder(h) for h in self.hypotheses]
+        keys = [[self.letters(w) for w in tail] for tail in tails]
+        agreed = 0
+        while all(agreed < len(key) for key in keys) and len({key[agreed] for key in keys}) == 1:
+            agreed += 1
+
+        confirmed = tails[-1][:agreed]
+        self.committed.extend(confirmed)
+        return confirmed
+
+    def finish(self, words):
+        """Transcription finale de l'énoncé : tout ce qui n'était pas confirmé l'est"""
+        confirmed = self.remainder(self.clean(words))
+        self.committed.extend(confirmed)
+        return confirmed
+
+
+class StreamingDecoder:
+    """Transcription en continu de l'énoncé en cours, pour une source.
+
+    Le thread de capture signale l'énoncé en cours tous les `step_ms`
+    (`follow`) puis sa fin (`finish`) ou son abandon (`cancel`). Un thread
+    dédié retranscrit l'énoncé depuis son début avec `transcribe(audio,
+    prompt, stats)` (liste de mots, None si l'énoncé n'a pas été transcrit)
+    et passe les mots confirmés par `LocalAgreement` à
+    `on_confirmed(committed, new_count, audio, final, transcribed)`.
+    Si le modèle est plus lent que le flux, seule la version la plus récente
+    de l'énoncé en cours est transcrite. Les derniers énoncés transcrits
+    (`context_chars` caractères) servent de contexte au décodeur.
+    """
+
+    def __init__(self, transcribe, on_confirmed, step_ms=500, agreement=2, context_chars=200, name="stream"):
+        self.transcribe = transcribe
+        self.on_confirmed = on_confirmed
+        self.step_ms = step_ms
+        self.context_chars = context_chars
+        self.agreement = LocalAgreement(agreement)
+
+        self.submitted_ms = 0
+        self.context = ""
+        self.jobs = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, audio=None, stats=None):
+        with self.condition:
+            # Une version plus récente de l'énoncé remplace celle qui attend encore
+            while self.jobs and self.jobs[-1][0] == 'partial':
+                self.jobs.pop()
+            self.jobs.append((kind, audio, stats))
+            self.condition.notify()
+
+    def follow(self, segmenter):
+        """Appelé après chaque bloc audio : soumet l'énoncé en cours tous les `step_ms`"""
+        partial_ms = segmenter.partial_ms
+        if not partial_ms:
+            # Énoncé abandonné par le segmenteur (trop court)
+            if self.submitted_ms:
+                self.cancel()
+            return
+        if partial_ms - self.submitted_ms >= self.step_ms:
+            self.submitted_ms = partial_ms
+            self.submit('partial', segmenter.partial())
+
+    def finish(self, audio, stats=None):
+        """L'énoncé est terminé : dernière transcription, tout le reste est confirmé"""
+        self.submitted_ms = 0
+        self.submit('final', audio, stats)
+
+    def cancel(self):
+        """L'énoncé en cours est abandonné (son joué, VAD réinitialisé...)"""
+        if not self.submitted_ms:
+            return
+        self.submitted_ms = 0
+        self.submit('cancel')
+
+    def close(self):
+        """Arrête le thread une fois les énoncés en attente traités"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.closed:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                kind, audio, stats = self.jobs.popleft()
+
+            if kind == 'cancel':
+                self.agreement.reset()
+                continue
+
+            try:
+                words = self.transcribe(audio, self.context or None, stats if kind == 'final' else None)
+            except Exception as e:
+                print(f"⚠️ Erreur transcription en continu: {e}")
+                words = None
+            transcribed = words is not None
+            words = words or []
+
+            final = kind == 'final'
+            confirmed = self.agreement.finish(words) if final else self.agreement.insert(words)
+            committed = self.agreement.committed
+            if confirmed or final:
+                self.on_confirmed(list(committed), len(confirmed), audio, final, transcribed)
+
+            if final:
+                if self.context_chars:
+                    text = " ".join(w['word'].strip() for w in committed)
+                    self.context = (self.context + " " + text).strip()[-self.context_chars:]
+                self.agreement.reset()
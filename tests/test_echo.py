@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from echo import EchoCanceller, EchoReference
+from resampler import PIPELINE_RATE
+
+
+def correlated_reference(a, seconds, rng):
+    """Bruit AR(1) : x[k] = a·x[k-1] + w[k], comme une voix ou une musique"""
+    noise = rng.normal(size=seconds * PIPELINE_RATE)
+    x = np.zeros_like(noise)
+    for k in range(1, len(x)):
+        x[k] = a * x[k - 1] + noise[k]
+    return (x / np.std(x) * 3000).astype(np.float32)
+
+
+@pytest.mark.parametrize("a", [0.0, 0.9, 0.98])
+def test_converges_on_correlated_reference(a):
+    rng = np.random.default_rng(0)
+    reference = correlated_reference(a, 6, rng)
+    room = np.zeros(300)
+    room[40] = 0.6
+    room[41:] = rng.normal(scale=0.05, size=259) * np.exp(-np.arange(259) / 60)
+    mic = np.convolve(reference, room)[:len(reference)]
+
+    canceller = EchoCanceller()
+    canceller.add_reference(EchoReference(reference, 0.0))
+    chunk = 480
+    residual = []
+    for start in range(0, len(mic) - chunk, chunk):
+        data = np.clip(mic[start:start + chunk], -32768, 32767).astype(np.int16).tobytes()
+        out = canceller.process(data, (start + chunk) / PIPELINE_RATE)
+        assert out is not None
+        if start >= len(mic) - PIPELINE_RATE and out:
+            residual.append(np.frombuffer(out, dtype=np.int16).astype(np.float32))
+
+    assert np.all(np.isfinite(canceller.weights))
+    assert 20 * np.log10(canceller.erle) >= 10
+    # Dernière seconde : l'écho est retiré, le micro n'est pas pour autant coupé à tort
+    echo_rms = np.sqrt(np.mean(np.square(mic[-PIPELINE_RATE:])))
+    assert np.sqrt(np.mean(np.square(np.concatenate(residual)))) < echo_rms / 3
+
+
+def test_resets_diverged_filter():
+    rng = np.random.default_rng(1)
+    reference = EchoReference(correlated_reference(0.9, 1, rng), 0.0)
+    canceller = EchoCanceller()
+    canceller.add_reference(reference)
+    canceller.delay = 0
+    canceller.anchor = 0.0
+    canceller.weights[:] = np.nan
+
+    out = canceller.cancel(reference, 0, reference.samples[:480].copy())
+    assert np.all(np.isfinite(canceller.weights))
+    assert np.all(np.isfinite(out))
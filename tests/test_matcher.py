@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from matcher import ExpressionMatcher
+
+CONFIG = Path(__file__).resolve().parent.parent / "config.json"
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return ExpressionMatcher(json.loads(CONFIG.read_text(encoding="utf-8"))["expressions"])
+
+
+@pytest.mark.parametrize("text", [
+    "Le magasin, il est ouvert ?",
+    "C'est oublié",
+    "ou casser la croûte",
+    "bon en vrai du coup il est ouvert",
+])
+def test_location_question_needs_whole_words(matcher, text):
+    assert "location_question" not in matcher.find(text)
+
+
+@pytest.mark.parametrize("text", ["Il est où ?", "c'est où le truc", "Où ça ?"])
+def test_location_question(matcher, text):
+    assert "location_question" in matcher.find(text)
+
+
+def test_patterns_start_at_word_boundaries(matcher):
+    assert "en_gros" not in matcher.find("maintenant gros malin")
+    assert "en_gros" in matcher.find("en gros, c'est fini")
+
+
+@pytest.mark.parametrize("text", ["un ton belliqueux", "une réponse belliqueuse", "il y a une contrition"])
+def test_prefix_expressions_match_word_starts(matcher, text):
+    assert "mots_choisis" in matcher.find(text)
+
+
+def test_prefix_expressions_still_need_word_start(matcher):
+    assert "mots_choisis" not in matcher.find("la rencontre")
+
+
+@pytest.mark.parametrize("text", ["on mange à la quand toche", "Quand-toche !", "à la cantauche ce midi"])
+def test_fuzzy_cantoche(matcher, text):
+    assert "cantoche" in matcher.find(text)
+
+
+@pytest.mark.parametrize("text", [
+    "il a un contact",
+    "quand toi tu viens",
+    "je suis content",
+    "quand tu veux",
+    "le cantonnier",
+    "on compte",
+])
+def test_fuzzy_cantoche_ignores_everyday_words(matcher, text):
+    assert "cantoche" not in matcher.find(text)
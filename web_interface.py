@@ -1,13 +1,17 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 import json
+import queue
 import os
-from pathlib import Path
-import threading
 
 def create_app(tic_detector_app):
     app = Flask(__name__)
     app.tic_detector = tic_detector_app
     
+    def submit(action, function, *args):
+        """Met une action de contrôle en file et répond tout de suite avec son suivi"""
+        job = app.tic_detector.controls.submit(action, function, *args)
+        return jsonify({'success': True, 'job': job, 'recording': app.tic_detector.is_recording}), 202
+    
     @app.route('/')
     def index():
         return render_template('index.html')
@@ -20,12 +24,16 @@ def create_app(tic_detector_app):
     def update_config():
         try:
             new_config = request.json
-            app.tic_detector.config.update(new_config)
-            app.tic_detector.save_config()
+            # Nouvelle version de la config (le matcher suit) ; les segments en cours finissent sur l'ancienne
+            app.tic_detector.update_config(lambda config: config.update(new_config))
             
-            # Recharger le modèle Whisper si nécessaire
-            if 'whisper_model' in new_config:
-                app.tic_detector.load_whisper_model()
+            # Changer de modèle Whisper si nécessaire (chargé en arrière-plan, l'ancien continue de servir)
+            if 'whisper_model' in new_config or 'asr_config' in new_config:
+                app.tic_detector.switch_model()
+
+            # Filtre par mots-clés : (re)chargé dans son propre thread, l'ancien continue de servir
+            if 'spotter_config' in new_config:
+                app.tic_detector.reload_spotter()
 
             # --- AJOUTER CE BLOC ---
             # Réinitialiser le VAD si ses paramètres ont changé
@@ -46,8 +54,7 @@ def create_app(tic_detector_app):
     def update_expression(expr_key):
         try:
             expr_data = request.json
-            app.tic_detector.config['expressions'][expr_key] = expr_data
-            app.tic_detector.save_config()
+            app.tic_detector.update_config(lambda config: config['expressions'].update({expr_key: expr_data}))
             return jsonify({'success': True})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)})
@@ -56,8 +63,7 @@ def create_app(tic_detector_app):
     def delete_expression(expr_key):
         try:
             if expr_key in app.tic_detector.config['expressions']:
-                del app.tic_detector.config['expressions'][expr_key]
-                app.tic_detector.save_config()
+                app.tic_detector.update_config(lambda config: config['expressions'].pop(expr_key, None))
             return jsonify({'success': True})
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)})
@@ -68,14 +74,16 @@ def create_app(tic_detector_app):
             expr_data = request.json
             expr_key = expr_data.get('key')
             if expr_key:
-                app.tic_detector.config['expressions'][expr_key] = {
+                expression = {
                     'name': expr_data.get('name', ''),
                     'patterns': expr_data.get('patterns', []),
                     'action': expr_data.get('action', 'mp3'),
                     'mp3_file': expr_data.get('mp3_file', ''),
-                    'enabled': expr_data.get('enabled', True)
+                    'enabled': expr_data.get('enabled', True),
+                    'fuzzy': expr_data.get('fuzzy', False),
+                    'fuzzy_distance': expr_data.get('fuzzy_distance', 1)
                 }
-                app.tic_detector.save_config()
+                app.tic_detector.update_config(lambda config: config['expressions'].update({expr_key: expression}))
                 return jsonify({'success': True})
             return jsonify({'success': False, 'error': 'Clé manquante'})
         except Exception as e:
@@ -83,51 +91,141 @@ def create_app(tic_detector_app):
     
     @app.route('/api/stats')
     def get_stats():
-        return jsonify(app.tic_detector.get_stats())
+        since = request.args.get('since', type=int)
+        return jsonify(app.tic_detector.get_stats(since))
+    
+    @app.route('/api/health')
+    def get_health():
+        """État du démarrage (micro, modèle, préchauffage) : 503 tant que tout n'est pas prêt"""
+        health = app.tic_detector.get_health()
+        return jsonify(health), 200 if health['ready'] else 503
+    
+    @app.route('/api/metrics')
+    def get_metrics():
+        return Response(app.tic_detector.metrics.render(), mimetype='text/plain; version=0.0.4')
+    
+    @app.route('/api/events')
+    def stream_events():
+        """Flux SSE : chaque détection est poussée dès qu'elle a lieu"""
+        tic_detector = app.tic_detector
+        last_id = request.headers.get('Last-Event-ID', type=int)
+        
+        def format_event(event, data, event_id=None):
+            message = f"event: {event}\n"
+            if event_id is not None:
+                message += f"id: {event_id}\n"
+            return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        
+        def generate():
+            subscriber = tic_detector.events.subscribe()
+            try:
+                # Reconnexion : on renvoie ce que le client a manqué
+                if last_id is not None:
+                    for detection in tic_detector.detection_log.since(last_id):
+                        yield format_event('detection', {
+                            'detection': detection,
+                            'detection_stats': tic_detector.detection_stats_snapshot()
+                        }, detection['seq'])
+                
+                while True:
+                    try:
+                        event, data, event_id = subscriber.get(timeout=15)
+                        yield format_event(event, data, event_id)
+                    except queue.Empty:
+                        # Commentaire SSE pour garder la connexion ouverte
+                        yield ": keepalive\n\n"
+            finally:
+                tic_detector.events.unsubscribe(subscriber)
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @app.route('/api/history')
+    def get_history():
+        try:
+            before = request.args.get('before', type=int)
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            return jsonify(app.tic_detector.detection_log.history(
+                expression_key=request.args.get('expression'),
+                before=before,
+                limit=limit
+            ))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/history/counts')
+    def get_history_counts():
+        try:
+            return jsonify(app.tic_detector.detection_log.counts(
+                period=request.args.get('period', 'hour'),
+                since=request.args.get('since'),
+                expression_key=request.args.get('expression')
+            ))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     
     @app.route('/api/start')
     def start_detection():
-        if not app.tic_detector.is_recording:
-            threading.Thread(target=app.tic_detector.start_listening, daemon=True).start()
-        return jsonify({'success': True, 'recording': app.tic_detector.is_recording})
+        return submit('start', app.tic_detector.start_in_background)
     
     @app.route('/api/stop')
     def stop_detection():
-        app.tic_detector.stop_listening()
-        return jsonify({'success': True, 'recording': app.tic_detector.is_recording})
+        # Le micro et le son restent prêts pour un prochain démarrage
+        return submit('stop', app.tic_detector.stop_listening, False)
+    
+    @app.route('/api/jobs/<int:job_id>')
+    def get_job(job_id):
+        """Suivi d'une action de contrôle (aussi poussé en SSE : événement `job`)"""
+        job = app.tic_detector.controls.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Action inconnue'}), 404
+        return jsonify(job)
     
     @app.route('/api/mp3_files')
     def get_mp3_files():
-        mp3_files = []
-        mp3_dir = Path('mp3')
-        if mp3_dir.exists():
-            mp3_files = [f.name for f in mp3_dir.glob('*.mp3')]
-        return jsonify(mp3_files)
+        # Relu seulement quand le dossier mp3/ change
+        return jsonify(app.tic_detector.mp3_listing.list())
     
     @app.route('/api/play_mp3/<filename>')
     def play_mp3(filename):
-        try:
-            success = app.tic_detector.play_mp3(filename)
-            return jsonify({'success': success})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+        return submit('play_mp3', app.tic_detector.play_mp3, filename)
     
     @app.route('/api/play_recording/<filename>')
     def play_recording(filename):
-        try:
-            success = app.tic_detector.replay_audio(filename)
-            return jsonify({'success': success})
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+        return submit('play_recording', app.tic_detector.replay_audio, filename)
+    
+    @app.route('/api/recordings')
+    def get_recordings():
+        return jsonify(app.tic_detector.recording_store.list())
     
     @app.route('/download/recording/<filename>')
     def download_recording(filename):
         try:
-            file_path = Path('recordings') / filename
-            if file_path.exists():
-                return send_file(file_path, as_attachment=True)
+            file_path = app.tic_detector.recording_store.path(filename)
+            if file_path and file_path.exists():
+                app.tic_detector.recording_store.touch(filename)
+                return send_file(file_path.resolve(), as_attachment=True)
             return jsonify({'error': 'Fichier non trouvé'}), 404
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    return app
\ No newline at end of file
+    return app
+
+
+def serve(app, web_config):
+    """Sert l'interface avec waitress (serveur WSGI multi-threadé) s'il est installé
+
+    Chaque client connecté au flux SSE occupe un thread : `threads` doit
+    couvrir les onglets ouverts en plus des requêtes ordinaires.
+    """
+    host = web_config.get("host", "0.0.0.0")
+    port = web_config.get("port", 5010)
+    threads = web_config.get("threads", 16)
+    print(f"🌐 Interface web disponible sur http://localhost:{port}")
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print("⚠️ waitress non installé (pip install waitress) : serveur de développement Flask")
+        app.run(host=host, port=port, threaded=True, debug=False)
+        return
+    waitress_serve(app, host=host, port=port, threads=threads)
\ No newline at end of file